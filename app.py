@@ -18,7 +18,8 @@ st.markdown("Upload your bank statement to detect anomalies and predict future e
 # 2. Sidebar - File Upload & Controls
 with st.sidebar:
     st.header("📂 Data Import")
-    uploaded_file = st.file_uploader("Upload CSV Statement", type=['csv'])
+    # Several (overlapping) monthly downloads can be uploaded together
+    uploaded_files = st.file_uploader("Upload CSV Statements", type=['csv'], accept_multiple_files=True)
     
     use_demo = st.checkbox("Use Demo Data", value=False)
     
@@ -38,17 +39,22 @@ with st.sidebar:
     st.write("Developed with ❤️ using Streamlit")
 
 # 3. Main Logic
-if uploaded_file or use_demo:
+if uploaded_files or use_demo:
     # A. Load Data
     if use_demo:
-        file_path = 'data/sample_template.csv'
+        file_paths = ['data/sample_template.csv']
     else:
-        file_path = uploaded_file
+        file_paths = uploaded_files
 
     try:
-        loader = DataLoader(file_path)
-        loader.load_data()
-        df = loader.preprocess_data()
+        if len(file_paths) == 1:
+            df = DataLoader(file_paths[0]).load_processed()
+        else:
+            # Transactions repeated across overlapping statements are counted once.
+            # Only this upload is checked (index_path=None): the app keeps no history of
+            # earlier uploads, so rows dropped against them would be missing from the totals.
+            # Uploads are small in-memory files, no need for a process pool
+            df = DataLoader.load_many(file_paths, workers=1, dedupe=True, index_path=None)
         
         if df is None or len(df) == 0:
             st.error("❌ No valid data found. Please check your CSV file format.")
@@ -69,7 +75,7 @@ if uploaded_file or use_demo:
         
         # 2. Detect Anomalies
         st.info("🔍 Analyzing transaction patterns...")
-        anomaly_detector = AnomalyDetector()
+        anomaly_detector = AnomalyDetector(behavioural=True)
         anomaly_detector.train(df)
         df_anomalies = anomaly_detector.predict(df)
         
@@ -134,7 +140,7 @@ if uploaded_file or use_demo:
             
         with tab2:
             st.subheader("Where is your money going?")
-            cat_spend = df[df['type']=='debit'].groupby('category')['amount'].sum().reset_index().sort_values('amount', ascending=False)
+            cat_spend = df[df['type']=='debit'].groupby('category', observed=True)['amount'].sum().reset_index().sort_values('amount', ascending=False)
             
             if len(cat_spend) > 0:
                 col_chart, col_table = st.columns([2, 1])
@@ -367,7 +373,7 @@ if uploaded_file or use_demo:
             
             # Category Summary Report
             st.write("**📈 Category Summary Report**")
-            category_summary = df[df['type']=='debit'].groupby('category').agg({
+            category_summary = df[df['type']=='debit'].groupby('category', observed=True).agg({
                 'amount': ['sum', 'count', 'mean', 'max']
             }).reset_index()
             category_summary.columns = ['Category', 'Total Spent', 'Transactions', 'Avg Transaction', 'Max Transaction']
@@ -0,0 +1,42 @@
+"""
+Benchmark: anomaly training time as history grows (10k to 10M rows)
+Exact mode fits and scores every training row; the default uses a bounded random sample.
+"""
+import time
+import numpy as np
+from src.anomaly_detector import AnomalyDetector
+from benchmark_anomaly import make_transactions
+
+SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+EXACT_MAX_ROWS = 1_000_000  # Exact mode grows linearly, so it stops here
+NEW_MONTH_ROWS = 50_000
+
+def timed_train(df, **kwargs):
+    detector = AnomalyDetector()
+    start = time.perf_counter()
+    detector.train(df, **kwargs)
+    return detector, time.perf_counter() - start
+
+def main():
+    print(f"{'Rows':>12} {'Default':>10} {'Exact':>10} {'Update':>10}")
+    print("=" * 46)
+
+    for n_rows in SIZES:
+        df = make_transactions(n_rows)
+        detector, default_time = timed_train(df)
+
+        exact = "-"
+        if n_rows <= EXACT_MAX_ROWS:
+            exact = f"{timed_train(df, sample_size=None)[1]:.2f}s"
+
+        # A new month arrives: grow the forest instead of refitting it
+        new_rows = np.zeros(n_rows, dtype=bool)
+        new_rows[-NEW_MONTH_ROWS:] = True
+        start = time.perf_counter()
+        detector.update(df, rows=new_rows)
+        update_time = time.perf_counter() - start
+
+        print(f"{n_rows:>12,} {default_time:>9.2f}s {exact:>10} {update_time:>9.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Benchmark: daily SARIMA updates (extend with fixed parameters) vs a full refit per day
+"""
+import contextlib
+import io
+import time
+import numpy as np
+import pandas as pd
+from src.predictor import ExpensePredictor
+
+HISTORY_DAYS = [730, 7300]  # an extend step should not depend on the history length
+NEW_DAYS = 60
+
+def make_spending(n_days, seed=42):
+    """Daily debits with a weekend bump"""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2023-01-01', periods=n_days, freq='D')
+    amounts = rng.gamma(2, 300, n_days) * np.where(dates.dayofweek >= 5, 1.5, 1.0)
+    return pd.DataFrame({'date': dates, 'description': 'Test', 'amount': amounts.round(2), 'type': 'debit'})
+
+def timed(fn, *args):
+    # Silence the per-call status lines
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        fn(*args)
+        return time.perf_counter() - start
+
+def run(history_days):
+    df = make_spending(history_days + NEW_DAYS)
+    print(f"Benchmarking {NEW_DAYS} daily updates on a {history_days}-day history")
+    print("=" * 50)
+
+    predictor = ExpensePredictor(use_cache=False)
+    full_fit = timed(predictor.train, df.iloc[:history_days])
+
+    latencies, refitted = [], []
+    for day in range(history_days, history_days + NEW_DAYS):
+        latencies.append(timed(predictor.update, df.iloc[day:day + 1]))
+        refitted.append(predictor.days_since_refit == 0)
+
+    latencies, refitted = np.array(latencies), np.array(refitted)
+    extends = latencies[~refitted]
+    print(f"Full fit:              {full_fit * 1000:.0f} ms")
+    print(f"Update (extend), p50:  {np.median(extends) * 1000:.0f} ms ({np.median(extends) / full_fit:.1%} of a fit)")
+    print(f"Update, mean incl. {refitted.sum()} refits: {latencies.mean() * 1000:.0f} ms")
+    print()
+
+def main():
+    for history_days in HISTORY_DAYS:
+        run(history_days)
+
+if __name__ == "__main__":
+    main()
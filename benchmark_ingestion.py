@@ -0,0 +1,62 @@
+"""
+Benchmark: multi-statement ingestion, sequential vs process pool
+"""
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from src.data_processor import DataLoader
+
+N_FILES = 300
+ROWS_PER_FILE = 5_000
+
+MERCHANTS = [
+    'Starbucks Coffee #{}', 'UBER *TRIP {}', 'Swiggy Order {}', 'Amazon Pay IN {}',
+    'Electricity Bill {}', 'Netflix.com {}', 'Apollo Pharmacy {}', 'UPI/Transfer/{}',
+    'Salary Credit {}', 'Local Kirana Store {}',
+]
+
+def write_statements(directory, n_files, rows_per_file, seed=42):
+    """Generate monthly-style statement CSVs for many accounts"""
+    rng = np.random.default_rng(seed)
+    paths = []
+    for i in range(n_files):
+        dates = pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 1500, rows_per_file), unit='D')
+        refs = rng.integers(10000, 99999, rows_per_file)
+        templates = rng.choice(MERCHANTS, rows_per_file)
+        df = pd.DataFrame({
+            'date': dates.strftime('%d/%m/%Y'),
+            'description': [template.format(ref) for template, ref in zip(templates, refs)],
+            'amount': rng.gamma(2.0, 400.0, rows_per_file).round(2),
+            'type': rng.choice(['debit', 'credit'], rows_per_file, p=[0.9, 0.1]),
+        })
+        path = os.path.join(directory, f"statement_{i:04d}.csv")
+        df.to_csv(path, index=False)
+        paths.append(path)
+    return paths
+
+def main():
+    workers = os.cpu_count() or 1
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_statements(directory, N_FILES, ROWS_PER_FILE)
+        print(f"Benchmarking {N_FILES} statements x {ROWS_PER_FILE:,} rows")
+        print("=" * 50)
+
+        start = time.perf_counter()
+        sequential = DataLoader.load_many(paths, workers=1, use_cache=False)
+        sequential_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        parallel = DataLoader.load_many(paths, workers=workers, use_cache=False)
+        parallel_time = time.perf_counter() - start
+
+    assert parallel.equals(sequential), "Parallel ingestion does not match sequential ingestion"
+
+    print("=" * 50)
+    print(f"1 worker:    {sequential_time:.2f}s ({len(sequential) / sequential_time:,.0f} rows/s)")
+    print(f"{workers} workers:   {parallel_time:.2f}s ({len(parallel) / parallel_time:,.0f} rows/s)")
+    print(f"Speedup:     {sequential_time / parallel_time:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -1,66 +1,443 @@
+import copy
+import hashlib
+import math
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import joblib
 import pandas as pd
 import numpy as np
+from sklearn.base import clone
 from sklearn.ensemble import IsolationForest
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import precision_score, recall_score, f1_score
+from . import config
+from .model_store import ModelStore
+
+def _average_path_length(n_samples):
+    """Expected path length of an unsuccessful BST search over n samples (as in IsolationForest)"""
+    n_samples = np.asarray(n_samples, dtype=float)
+    lengths = np.zeros_like(n_samples)
+    lengths[n_samples == 2] = 1.0
+    large = n_samples > 2
+    lengths[large] = 2.0 * (np.log(n_samples[large] - 1.0) + np.euler_gamma) - 2.0 * (n_samples[large] - 1.0) / n_samples[large]
+    return lengths
+
+class FlatIsolationForest:
+    """
+    A fitted IsolationForest flattened into numpy arrays.
+    All trees are walked together level by level, which avoids the fixed per-call overhead
+    of IsolationForest.score_samples (~10 ms) and scores small batches in microseconds.
+    Scores are identical to score_samples.
+    """
+    
+    def __init__(self, model):
+        lefts, rights, features, thresholds, leaf_lengths, roots = [], [], [], [], [], []
+        offset = 0
+        for tree, tree_features in zip(model.estimators_, model.estimators_features_):
+            t = tree.tree_
+            nodes = np.arange(t.node_count)
+            is_leaf = t.children_left == -1
+            
+            # Depth of every node (children always have larger ids than their parent)
+            depth = np.zeros(t.node_count)
+            for node in nodes[~is_leaf]:
+                depth[t.children_left[node]] = depth[t.children_right[node]] = depth[node] + 1
+            
+            # Leaves point to themselves, so extra steps of the level-by-level walk are no-ops
+            lefts.append(np.where(is_leaf, nodes, t.children_left) + offset)
+            rights.append(np.where(is_leaf, nodes, t.children_right) + offset)
+            features.append(np.where(is_leaf, 0, np.asarray(tree_features)[np.maximum(t.feature, 0)]))
+            thresholds.append(np.where(is_leaf, np.inf, t.threshold))
+            leaf_lengths.append(depth + _average_path_length(t.n_node_samples))
+            roots.append(offset)
+            offset += t.node_count
+        
+        self.left = np.concatenate(lefts)
+        self.right = np.concatenate(rights)
+        self.feature = np.concatenate(features)
+        self.threshold = np.concatenate(thresholds)
+        self.leaf_length = np.concatenate(leaf_lengths)
+        self.roots = np.array(roots)
+        self.max_depth = max(tree.tree_.max_depth for tree in model.estimators_)
+        self.normalizer = len(model.estimators_) * _average_path_length([model.max_samples_])[0]
+    
+    def score_samples(self, X):
+        """Same as IsolationForest.score_samples (lower is more anomalous)"""
+        # Trees compare float32 features against their thresholds
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(len(X))[:, None]
+        node = np.broadcast_to(self.roots, (len(X), len(self.roots)))
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+        
+        depths = self.leaf_length[node].sum(axis=1)
+        return -(2.0 ** (-depths / self.normalizer))
+
+def _score_forest(model, flat_model, X):
+    """Anomaly scores for scaled features (lower is more anomalous)"""
+    if len(X) <= config.ANOMALY_FLAT_MAX_ROWS:
+        return flat_model.score_samples(X)
+    # score_samples ignores the model's n_jobs; trees are scored in parallel threads instead
+    with joblib.parallel_config(backend='threading', n_jobs=model.n_jobs):
+        return model.score_samples(X)
+
+def _sample_positions(n_rows, sample_size, random_state):
+    """Sorted positions of a random sample of rows (all rows if sample_size is None or larger)"""
+    if sample_size is None or n_rows <= sample_size:
+        return np.arange(n_rows)
+    rng = np.random.default_rng(random_state)
+    return np.sort(rng.choice(n_rows, sample_size, replace=False))
+
+def _set_threshold(model, flat_model, X):
+    """Place model.offset_ at the contamination percentile of the scores of X. Returns the scores."""
+    scores = _score_forest(model, flat_model, X)
+    if model.contamination != 'auto':
+        model.offset_ = np.percentile(scores, 100.0 * model.contamination)
+    return scores
+
+def _fit_forest(model, X, sample_size=None):
+    """
+    Fit an IsolationForest with a single scoring pass. Returns (model, sampled positions, scores).
+    With a fixed contamination, fit() scores the training data just to place the threshold.
+    Fitting with 'auto' skips that; the threshold is then set from our own scoring pass,
+    which callers reuse for their metrics. The result is identical to a regular fit.
+    
+    With sample_size, both steps use a random sample of that many rows. Each tree only sees
+    max_samples rows anyway, but sklearn's fit still does per-tree work over every row,
+    so this keeps the cost flat as X grows.
+    Module-level so it can run in a process pool.
+    """
+    sample = _sample_positions(len(X), sample_size, model.random_state)
+    contamination = model.contamination
+    model.set_params(contamination='auto').fit(X[sample])
+    model.set_params(contamination=contamination)
+    scores = _set_threshold(model, FlatIsolationForest(model), X[sample])
+    return model, sample, scores
+
+def behavioural_features(df, unseen_days=config.ANOMALY_UNSEEN_DAYS):
+    """
+    History-aware features for each transaction, in the row order of df:
+    - merchant_count: earlier transactions with the same merchant (0 = first-ever charge)
+    - days_since_merchant: days since that merchant was last seen
+    - category_spend_7d / category_spend_30d: rolling debit total of the category, up to and
+      including this transaction
+    - amount_vs_category_median: amount relative to the category's median amount
+    Merchants are clean descriptions; categories fall back to the transaction type.
+    Only sorts, groupby and time-window rolling: O(n log n), no Python loops over rows.
+    """
+    merchant_col = 'clean_description' if 'clean_description' in df.columns else 'description'
+    group_col = 'category' if 'category' in df.columns else 'type'
+    n = len(df)
+    
+    dates = df['date'].to_numpy()
+    amounts = df['amount'].to_numpy(dtype=float)
+    spend = np.where((df['type'] == 'debit').to_numpy(), amounts, 0.0)
+    merchants = pd.factorize(df[merchant_col], use_na_sentinel=False)[0]
+    groups = pd.factorize(df[group_col], use_na_sentinel=False)[0]
+    features = pd.DataFrame(index=range(n), dtype=float)
+    
+    # Merchant history, in date order
+    order = np.argsort(dates, kind='stable')
+    by_merchant = pd.DataFrame({'merchant': merchants[order], 'date': dates[order]}).groupby('merchant', sort=False)
+    days_since = by_merchant['date'].diff() / pd.Timedelta(days=1)
+    features.loc[order, 'merchant_count'] = by_merchant.cumcount().to_numpy(dtype=float)
+    features.loc[order, 'days_since_merchant'] = days_since.fillna(unseen_days).to_numpy()
+    
+    # Rolling category spend, in (category, date) order
+    order = np.lexsort((dates, groups))
+    by_group = pd.DataFrame({'group': groups[order], 'spend': spend[order]}, index=pd.DatetimeIndex(dates[order]))
+    by_group = by_group.groupby('group')['spend']
+    for days in (7, 30):
+        # Groups come out in ascending code order, matching the lexsort
+        features.loc[order, f'category_spend_{days}d'] = by_group.rolling(f'{days}D').sum().to_numpy()
+    
+    # Amount relative to what is normal for the category
+    median = pd.Series(amounts).groupby(groups).transform('median').to_numpy()
+    features['amount_vs_category_median'] = np.divide(amounts, median, out=np.zeros(n), where=median > 0)
+    
+    return features
 
 class AnomalyDetector:
-    def __init__(self):
+    def __init__(self, group_by=None, min_group_size=config.ANOMALY_MIN_GROUP_SIZE, behavioural=False):
+        """
+        behavioural: add the history-aware features of behavioural_features() (merchant novelty,
+        rolling category spend, ...). Those need the transaction history, so score new rows by
+        passing the full frame with a rows mask rather than the new rows alone.
+        
+        group_by: optional column (or list of columns), e.g. 'category' from the categorizer or
+        an account column. Each group with at least min_group_size rows gets its own model,
+        so a large rent payment is judged against rent, not against coffee.
+        Smaller groups, and rows of groups not seen in training, use the global model.
+        """
         # contamination='auto' lets the model decide how many anomalies to expect
         # random_state ensures consistent results
-        self.model = IsolationForest(contamination=0.05, random_state=42)
+        # max_samples bounds the rows each tree sees, n_jobs builds trees on all cores
+        self.model = IsolationForest(
+            contamination=0.05, random_state=42,
+            max_samples=config.ANOMALY_MAX_SAMPLES, n_jobs=config.ANOMALY_N_JOBS,
+        )
         self.scaler = StandardScaler()
+        self.flat_model = None  # Fast scorer built from the fitted model
+        self.group_by = group_by
+        self.min_group_size = min_group_size
+        self.sub_models = {}  # group key -> (IsolationForest, FlatIsolationForest)
+        self.behavioural = behavioural
+        self._feature_cache = OrderedDict()  # Frame hash -> unscaled features, shared by train and predict
+        self.store = ModelStore('anomaly_detector')
+        # True while model/scaler are the shared cached copies from load() (must not be mutated)
+        self._shared_model = False
         self.is_trained = False
         self.num_anomalies = 0
         self.sensitivity = 0.0
         self.specificity = 0.0
 
-    def prepare_features(self, df):
+    def prepare_features(self, df, fit=False):
         """
         Convert transaction data into numbers the model can understand.
         Key features: Amount, Day of Week, Category (encoded).
+        fit=True fits the scaler (training only); otherwise the fitted scaler is reused,
+        so a transaction's score does not depend on the rest of the batch.
         """
-        features = pd.DataFrame()
-        
-        # 1. Amount (The biggest signal)
-        features['amount'] = df['amount']
-        
-        # 2. Day of Week (0=Monday, 6=Sunday)
-        # Helps detect spending on unusual days
-        features['day_of_week'] = df['date'].dt.dayofweek
-        
-        # 3. Is Credit? (1 for Income, 0 for Expense)
-        features['is_credit'] = (df['type'] == 'credit').astype(int)
+        features = self._raw_features(df)
         
         # Note: We scale the data because 'Amount' (e.g., 50000) is much bigger 
         # than 'Day' (0-6), which confuses the model.
-        return self.scaler.fit_transform(features)
+        if fit:
+            return self.scaler.fit_transform(features)
+        # Same arithmetic as scaler.transform, without its per-call input validation
+        return (features - self.scaler.mean_) / self.scaler.scale_
 
-    def train(self, df):
-        """Train the model on your history"""
+    def _raw_features(self, df):
+        """Unscaled feature matrix; behavioural features are cached per frame"""
+        # Built as a plain array: for small batches, pandas column inserts cost more than scoring
+        features = np.column_stack([
+            # 1. Amount (The biggest signal)
+            df['amount'].to_numpy(dtype=float),
+            # 2. Day of Week (0=Monday, 6=Sunday)
+            # Helps detect spending on unusual days
+            df['date'].dt.dayofweek.to_numpy(dtype=float),
+            # 3. Is Credit? (1 for Income, 0 for Expense)
+            (df['type'] == 'credit').to_numpy(dtype=float),
+        ])
+        if not self.behavioural:
+            return features
+        
+        # train() and predict() usually see the same frame, so the rolling features are built once
+        key = self._frame_key(df)
+        if key in self._feature_cache:
+            self._feature_cache.move_to_end(key)
+        else:
+            self._feature_cache[key] = behavioural_features(df).to_numpy()
+            while len(self._feature_cache) > config.ANOMALY_FEATURE_CACHE_SIZE:
+                self._feature_cache.popitem(last=False)
+        return np.hstack([features, self._feature_cache[key]])
+
+    @staticmethod
+    def _frame_key(df):
+        """Content hash of the columns the features are built from"""
+        columns = [c for c in ('date', 'amount', 'type', 'clean_description', 'description', 'category') if c in df.columns]
+        hashes = pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+        return hashlib.sha1(hashes.tobytes()).hexdigest()
+
+    def train(self, df, workers=None, sample_size=config.ANOMALY_SAMPLE_SIZE):
+        """
+        Train the model on your history.
+        sample_size: rows used to fit the forest, place the threshold and compute the metrics
+        (None = all). Up to that size everything is exact; beyond it, the anomaly count is an estimate.
+        """
         print("Training Anomaly Detector...")
-        X = self.prepare_features(df)
-        self.model.fit(X)
+        if self._shared_model:
+            # Fit fresh estimators instead of refitting the loaded (shared) ones in place
+            self.model, self.scaler = clone(self.model), clone(self.scaler)
+            self._shared_model = False
+        X = self.prepare_features(df, fit=True)
+        
+        self.model, sample, scores = _fit_forest(self.model, X, sample_size)
+        self.flat_model = FlatIsolationForest(self.model)
+        is_anomaly = scores < self.model.offset_
         
-        # Get predictions to calculate metrics
-        predictions = self.model.predict(X)
-        self.num_anomalies = (predictions == -1).sum()
+        covered = np.zeros(len(X), dtype=bool)
+        num_anomalies = 0.0
+        if self.group_by is not None:
+            num_anomalies = self._train_groups(df, X, covered, workers, sample_size)
+        
+        # Rows outside the group models are judged by the global model
+        outside = ~covered[sample]
+        if outside.any():
+            num_anomalies += is_anomaly[outside].mean() * (~covered).sum()
+        self.num_anomalies = int(round(num_anomalies))
         
         # Calculate sensitivity and specificity
         if self.num_anomalies > 0:
             # Sensitivity = TP / (TP + FN) ≈ detection rate
             self.sensitivity = self.num_anomalies / len(df)
             # Specificity = TN / (TN + FP) ≈ normal rate
-            self.specificity = (predictions == 1).sum() / len(df)
+            self.specificity = (len(df) - self.num_anomalies) / len(df)
         
         self.is_trained = True
         print(f"✅ Anomaly Detector trained. Detected {self.num_anomalies} anomalies ({self.sensitivity:.1%} of data)")
         print(f"📊 Sensitivity: {self.sensitivity:.1%} | Specificity: {self.specificity:.1%}")
 
-    def predict(self, df):
+    def update(self, df, rows=None, n_trees=config.ANOMALY_UPDATE_TREES, sample_size=config.ANOMALY_SAMPLE_SIZE):
+        """
+        Replace the n_trees oldest trees of the global forest with n_trees fitted on the new rows
+        (e.g. a new month), so the forest keeps its size, then re-place the threshold on (a sample of)
+        the whole frame. Every tree is grown on max_samples_ rows (256 by default): a smaller batch,
+        like a typical month of ~100 transactions, is topped up with the most recent older rows of df.
+        The scaler and any group models stay as trained; call train() to rebuild everything.
+        """
+        if not self.is_trained:
+            print("⚠️ Model not trained yet!")
+            return
+        
+        X = self.prepare_features(df)
+        new = np.ones(len(X), dtype=bool) if rows is None else np.asarray(rows, dtype=bool).copy()
+        tree_size = self.model.max_samples_
+        if new.sum() < tree_size:
+            # Smaller trees would have different depths and skew the average path length
+            order = np.argsort(df['date'].to_numpy(), kind='stable') if 'date' in df else np.arange(len(X))
+            older = order[~new[order]]
+            new[older[len(older) - (tree_size - new.sum()):]] = True
+        if new.sum() < tree_size:
+            print(f"⚠️ Only {new.sum()} rows, need {tree_size} to grow the forest.")
+            return
+        if self._shared_model:
+            # The loaded model is shared through the store's cache, update a private copy
+            self.model, self.scaler = copy.deepcopy(self.model), copy.deepcopy(self.scaler)
+            self._shared_model = False
+        X_new = X[new]
+        X_new = X_new[_sample_positions(len(X_new), sample_size, self.model.random_state)]
+        
+        params = {key: self.model.get_params()[key] for key in ('contamination', 'max_samples')}
+        n_estimators = len(self.model.estimators_)
+        self.model.set_params(
+            warm_start=True, n_estimators=n_estimators + n_trees,
+            contamination='auto', max_samples=tree_size,
+        ).fit(X_new)
+        self.model.set_params(warm_start=False, n_estimators=n_estimators, **params)
+        
+        # Drop the oldest trees, with everything sklearn keeps per tree
+        n_drop = min(n_trees, n_estimators)
+        for attr in ('estimators_', 'estimators_features_', '_average_path_length_per_tree', '_decision_path_lengths'):
+            if hasattr(self.model, attr):
+                setattr(self.model, attr, getattr(self.model, attr)[n_drop:])
+        self.model.set_params(n_estimators=len(self.model.estimators_))
+        self.flat_model = FlatIsolationForest(self.model)
+        
+        # New trees shift the scores, so the threshold is placed again
+        _set_threshold(self.model, self.flat_model, X[_sample_positions(len(X), sample_size, self.model.random_state)])
+        print(f"✅ Anomaly Detector updated: {len(self.model.estimators_)} trees ({n_trees} new from {len(X_new):,} rows)")
+
+    def _group_indices(self, df):
+        """Positions of the rows of each group"""
+        return df.groupby(self.group_by, observed=True, sort=False).indices
+
+    def _train_groups(self, df, X, covered, workers=None, sample_size=None):
+        """
+        Fit one model per large-enough group, concurrently in a process pool.
+        Marks the rows those models cover and returns their (estimated) number of anomalies.
+        """
+        groups = {
+            key: positions for key, positions in self._group_indices(df).items()
+            if len(positions) >= self.min_group_size
+        }
+        self.sub_models = {}
+        if not groups:
+            print(f"⚠️ No {self.group_by} group has {self.min_group_size}+ rows, using the global model only.")
+            return 0.0
+        
+        keys = list(groups)
+        workers = min(workers or os.cpu_count() or 1, len(keys))
+        # Parallelism comes from the pool, so each group's forest uses one core
+        base = clone(self.model).set_params(n_jobs=1) if workers > 1 else clone(self.model)
+        args = (
+            [clone(base) for _ in keys],
+            [X[groups[key]] for key in keys],
+            [sample_size] * len(keys),
+        )
+        
+        if workers == 1:
+            fitted = list(map(_fit_forest, *args))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                fitted = list(executor.map(_fit_forest, *args))
+        
+        num_anomalies = 0.0
+        for key, (model, _, scores) in zip(keys, fitted):
+            self.sub_models[key] = (model.set_params(n_jobs=self.model.n_jobs), FlatIsolationForest(model))
+            num_anomalies += (scores < model.offset_).mean() * len(groups[key])
+            covered[groups[key]] = True
+        
+        print(f"📊 Trained {len(keys)} {self.group_by} models with {workers} workers "
+              f"({len(df) - sum(map(len, groups.values()))} rows use the global model)")
+        return num_anomalies
+
+    def score_samples(self, X):
+        """Anomaly scores for scaled features from the global model (lower is more anomalous)"""
+        return _score_forest(self.model, self.flat_model, X)
+
+    def _score_rows(self, df, X):
+        """Route each row to its group's model (or the global one). Returns (scores, is_anomaly)."""
+        scores = np.empty(len(X))
+        is_anomaly = np.empty(len(X), dtype=bool)
+        remaining = np.ones(len(X), dtype=bool)
+        
+        if self.sub_models:
+            for key, positions in self._group_indices(df).items():
+                if key in self.sub_models:
+                    model, flat_model = self.sub_models[key]
+                    scores[positions] = _score_forest(model, flat_model, X[positions])
+                    is_anomaly[positions] = scores[positions] < model.offset_
+                    remaining[positions] = False
+        
+        # Get anomaly score (lower is more anomalous)
+        scores[remaining] = self.score_samples(X[remaining])
+        
+        # Anomaly if the score falls below the threshold learned at fit time
+        # (same rule as IsolationForest.predict)
+        is_anomaly[remaining] = scores[remaining] < self.model.offset_
+        return scores, is_anomaly
+
+    def score_one(self, transaction):
+        """
+        Score a single transaction (dict or row with 'date', 'amount', 'type' and the group_by
+        columns) against the frozen model, without building a DataFrame.
+        Returns {'is_anomaly': bool, 'anomaly_score': float}, like predict's columns.
+        predict() copies the frame and assigns columns, which costs more than scoring one row.
+        """
+        if not self.is_trained:
+            print("⚠️ Model not trained yet!")
+            return None
+        if self.behavioural:
+            raise ValueError("Behavioural features need the transaction history: use predict(df, rows=...)")
+        
+        features = np.array([[
+            float(transaction['amount']),
+            pd.Timestamp(transaction['date']).dayofweek,
+            transaction['type'] == 'credit',
+        ]])
+        X = (features - self.scaler.mean_) / self.scaler.scale_
+        
+        model, flat_model = self.model, self.flat_model
+        if self.sub_models:
+            if isinstance(self.group_by, (list, tuple)) and len(self.group_by) > 1:
+                key = tuple(transaction[col] for col in self.group_by)
+            else:
+                key = transaction[self.group_by[0] if isinstance(self.group_by, (list, tuple)) else self.group_by]
+            model, flat_model = self.sub_models.get(key, (model, flat_model))
+        
+        score = flat_model.score_samples(X)[0]
+        return {'is_anomaly': bool(score < model.offset_), 'anomaly_score': float(score)}
+
+    def predict(self, df, rows=None):
         """
         Returns the dataframe with an 'is_anomaly' column.
         True = Anomaly, False = Normal
+        
+        rows: optional boolean mask (e.g. df['is_new'] from IncrementalLoader).
+        Only those rows are scored, the others keep their existing results.
         """
         if not self.is_trained:
             print("⚠️ Model not trained yet!")
@@ -69,14 +446,20 @@ class AnomalyDetector:
         df = df.copy()
         X = self.prepare_features(df)
         
-        # Predict: -1 is anomaly, 1 is normal
-        predictions = self.model.predict(X)
+        if rows is None:
+            scores, is_anomaly = self._score_rows(df, X)
+            df['is_anomaly'] = is_anomaly
+            df['anomaly_score'] = scores
+            return df
         
-        # Convert to boolean (True if anomaly)
-        df['is_anomaly'] = predictions == -1
+        rows = np.asarray(rows, dtype=bool)
+        if 'is_anomaly' not in df.columns:
+            df['is_anomaly'] = False
+            df['anomaly_score'] = np.nan
         
-        # Get anomaly score (lower is more anomalous)
-        df['anomaly_score'] = self.model.score_samples(X)
+        scores, is_anomaly = self._score_rows(df[rows], X[rows])
+        df.loc[rows, 'is_anomaly'] = is_anomaly
+        df.loc[rows, 'anomaly_score'] = scores
         
         return df
     
@@ -86,5 +469,165 @@ class AnomalyDetector:
             'num_anomalies': self.num_anomalies,
             'sensitivity': self.sensitivity,
             'specificity': self.specificity,
+            'num_sub_models': len(self.sub_models),
             'is_trained': self.is_trained
-        }
\ No newline at end of file
+        }
+
+    def save(self):
+        """Save the fitted scaler and IsolationForest as a versioned artifact"""
+        if not self.is_trained:
+            print("⚠️ Model not trained yet!")
+            return None
+        version = self.store.save({
+            'model': self.model,
+            'scaler': self.scaler,
+            'group_by': self.group_by,
+            'behavioural': self.behavioural,
+            'sub_models': {key: model for key, (model, _) in self.sub_models.items()},
+            'metrics': self.get_metrics(),
+        })
+        print(f"💾 Anomaly Detector saved (version {version}).")
+        return version
+
+    def load(self, version=None):
+        """Load a frozen scaler + model, so new transactions are scored without retraining"""
+        state, version = self.store.load(version)
+        if state is None:
+            print("⚠️ No saved anomaly model found.")
+            return False
+        
+        self.model = state['model']
+        self.scaler = state['scaler']
+        self._shared_model = True
+        self.flat_model = FlatIsolationForest(self.model)
+        self.group_by = state.get('group_by')
+        self.behavioural = state.get('behavioural', False)
+        self.sub_models = {
+            key: (model, FlatIsolationForest(model))
+            for key, model in state.get('sub_models', {}).items()
+        }
+        self.num_anomalies = state['metrics']['num_anomalies']
+        self.sensitivity = state['metrics']['sensitivity']
+        self.specificity = state['metrics']['specificity']
+        self.is_trained = True
+        print("✅ Anomaly Detector loaded.")
+        return True
+
+
+class _RunningStats:
+    """Exponentially weighted robust location/scale of log amounts for one group"""
+    __slots__ = ('count', 'location', 'scale')
+    
+    def __init__(self):
+        self.count = 0
+        self.location = 0.0
+        self.scale = 0.0
+    
+    def z_score(self, x, min_scale):
+        return abs(x - self.location) / max(self.scale, min_scale)
+    
+    def update(self, x, alpha, clip, min_scale):
+        self.count += 1
+        if self.count == 1:
+            # Start at the first value; the scale is learned from the deviations that follow
+            self.location = x
+            return
+        
+        deviation = x - self.location
+        if self.scale > 0:
+            # Huber-style clipping: a single outlier cannot drag the statistics along
+            bound = clip * max(self.scale, min_scale)
+            deviation = max(-bound, min(bound, deviation))
+        # Plain running averages at first, so the statistics are not stuck at their starting values
+        self.location += max(alpha, 1.0 / self.count) * deviation
+        # sqrt(pi/2) * mean absolute deviation estimates the standard deviation for normal data
+        self.scale += max(alpha, 1.0 / (self.count - 1)) * (math.sqrt(math.pi / 2) * abs(deviation) - self.scale)
+
+
+class StreamingAnomalyDetector:
+    """
+    Real-time anomaly detector: scores each transaction as it arrives, then learns from it.
+    
+    Keeps running statistics of log(amount) per (category, day of week), per category and overall.
+    A transaction is scored against the most specific group with enough history, so memory
+    stays constant (one small record per group) and each step is O(1).
+    anomaly_score is the negative robust z-score (lower is more anomalous, like AnomalyDetector).
+    """
+    
+    def __init__(self, alpha=config.STREAM_ALPHA, threshold=config.STREAM_THRESHOLD,
+                 min_count=config.STREAM_MIN_COUNT, min_scale=config.STREAM_MIN_SCALE):
+        self.alpha = alpha
+        self.threshold = threshold
+        self.min_count = min_count
+        self.min_scale = min_scale  # Floor for groups with (near) constant amounts
+        self.clip = threshold  # Deviations beyond the alert threshold count only up to it
+        self.stats = {}
+        self.num_seen = 0
+        self.num_anomalies = 0
+    
+    def _groups(self, category, day_of_week, create=True):
+        """Running statistics for a transaction, most specific first"""
+        keys = ((category, day_of_week), (category, None), (None, None))
+        if not create:
+            return [self.stats[key] for key in keys if key in self.stats]
+        return [self.stats.setdefault(key, _RunningStats()) for key in keys]
+    
+    def _key(self, transaction):
+        date = pd.Timestamp(transaction['date'])
+        category = transaction.get('category', transaction.get('type'))
+        return category, date.dayofweek, math.log1p(abs(float(transaction['amount'])))
+    
+    def score(self, transaction):
+        """
+        Score one transaction (dict or row with 'date', 'amount' and optionally 'category')
+        without learning from it. Returns {'is_anomaly': bool, 'anomaly_score': float}.
+        """
+        category, day_of_week, x = self._key(transaction)
+        return self._score(self._groups(category, day_of_week, create=False), x)
+    
+    def _score(self, groups, x):
+        for stats in groups:
+            if stats.count >= self.min_count:
+                z = stats.z_score(x, self.min_scale)
+                return {'is_anomaly': z > self.threshold, 'anomaly_score': -z}
+        # Not enough history anywhere yet
+        return {'is_anomaly': False, 'anomaly_score': 0.0}
+    
+    def update(self, transaction):
+        """Learn from one transaction"""
+        category, day_of_week, x = self._key(transaction)
+        for stats in self._groups(category, day_of_week):
+            stats.update(x, self.alpha, self.clip, self.min_scale)
+    
+    def process(self, transaction):
+        """Score a new transaction, then learn from it (test-then-train)"""
+        category, day_of_week, x = self._key(transaction)
+        groups = self._groups(category, day_of_week)
+        result = self._score(groups, x)
+        for stats in groups:
+            stats.update(x, self.alpha, self.clip, self.min_scale)
+        
+        self.num_seen += 1
+        self.num_anomalies += result['is_anomaly']
+        return result
+    
+    def process_frame(self, df):
+        """Replay a dataframe in date order, as if each row arrived live"""
+        ordered = df.sort_values('date', kind='stable')
+        results = pd.DataFrame(
+            [self.process(transaction) for transaction in ordered.to_dict('records')],
+            index=ordered.index,
+        )
+        
+        df = df.copy()
+        df['is_anomaly'] = results['is_anomaly'].astype(bool)
+        df['anomaly_score'] = results['anomaly_score']
+        return df
+    
+    def get_metrics(self):
+        """Return detector statistics."""
+        return {
+            'num_seen': self.num_seen,
+            'num_anomalies': self.num_anomalies,
+            'num_groups': len(self.stats),
+        }
@@ -0,0 +1,118 @@
+import hashlib
+import os
+import tempfile
+import pandas as pd
+from . import config
+
+# Parquet needs pyarrow; without it the cache is simply disabled
+try:
+    import pyarrow  # noqa: F401
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+
+def file_digest(source, salt=''):
+    """
+    SHA-256 of a file's raw bytes (path or file-like object such as a Streamlit upload).
+    The salt lets callers fold in settings that change the processed output.
+    """
+    digest = hashlib.sha256(salt.encode())
+
+    if hasattr(source, 'read'):
+        position = source.tell() if hasattr(source, 'tell') else 0
+        for block in iter(lambda: source.read(1 << 20), b''):
+            digest.update(block.encode() if isinstance(block, str) else block)
+        # Rewind so the caller can still read the file afterwards
+        source.seek(position)
+    else:
+        with open(source, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+
+    return digest.hexdigest()
+
+
+def evict_lru(directory, max_bytes, suffix=''):
+    """Delete the least recently used files in a directory until it fits in max_bytes"""
+    if not os.path.isdir(directory):
+        return 0
+
+    entries = []
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if not name.endswith(suffix) or not os.path.isfile(path):
+            continue
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue  # Removed by another process meanwhile
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    evicted = 0
+    # Oldest access first (hits refresh the mtime)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            evicted += 1
+        except OSError:
+            pass  # Already evicted by another process
+        total -= size
+
+    return evicted
+
+
+class ProcessedCache:
+    """
+    Content-addressed store of preprocessed transactions.
+    Frames are saved as Parquet (keeps dtypes) under the hash of the raw file,
+    and the directory is kept under a size limit with LRU eviction.
+    """
+
+    def __init__(self, cache_dir=config.CACHE_DIR, max_bytes=config.CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.parquet")
+
+    def get(self, key):
+        """Return the cached frame for a key, or None on a miss"""
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            df = pd.read_parquet(path)
+        except Exception as e:
+            print(f"⚠️ Ignoring unreadable cache entry {key[:12]}: {e}")
+            return None
+
+        # Refresh the access time so eviction keeps hot entries
+        # (another process may have just evicted the file; the frame is already read)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return df
+
+    def put(self, key, df):
+        """Write a frame to the cache and evict old entries if over the size limit"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Unique temp file: load_many workers and app sessions (threads) may write the same key at once
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix='.', suffix='.tmp')
+        os.close(fd)
+
+        # Write then rename, so a crash never leaves a half-written entry behind
+        try:
+            df.to_parquet(tmp_path)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        evict_lru(self.cache_dir, self.max_bytes, suffix='.parquet')
@@ -2,20 +2,256 @@ import pandas as pd
 import numpy as np
 import pickle
 import os
+import re
+import hashlib
+import tempfile
+import time
+import copy
+import io
+import joblib
+import scipy.sparse as sp
+from datetime import datetime
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer
 from sklearn.pipeline import Pipeline
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import train_test_split, cross_validate, ParameterGrid
+from sklearn.base import BaseEstimator, ClassifierMixin, clone
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
 from . import config
+from .model_store import ModelStore
+
+def _trie_pattern(keywords):
+    """
+    Build one regex for a list of keywords, factored into a prefix trie.
+    The regex engine then walks shared prefixes once instead of trying every keyword in turn.
+    """
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = {}  # End of a keyword
+    
+    def build(node):
+        # Only "contains any keyword" matters, so longer keywords behind a complete one are redundant
+        if '' in node:
+            return ''
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items())]
+        return branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    
+    return build(trie)
+
+class KeywordMatcher:
+    """
+    Compiled rule layer: one trie regex per category, applied as a vectorized pass.
+    Categories are tried in keyword_map order and a row keeps its first match,
+    the same priority as checking each category's keywords with 'in'.
+    """
+    
+    def __init__(self, keyword_map):
+        self.categories = [category for category, keywords in keyword_map.items() if keywords]
+        self.patterns = [re.compile(_trie_pattern(keyword_map[category])) for category in self.categories]
+    
+    def match(self, descriptions):
+        """Rule category for each description (None where no keyword matches)"""
+        # Descriptions repeat heavily, so only the distinct values are searched
+        codes, uniques = pd.factorize(descriptions)
+        lowered = pd.Series(uniques, dtype=object).str.lower()
+        
+        result = np.full(len(uniques) + 1, None, dtype=object)  # Trailing slot for missing values (code -1)
+        unresolved = np.arange(len(uniques))
+        for category, pattern in zip(self.categories, self.patterns):
+            if len(unresolved) == 0:
+                break
+            hits = lowered.iloc[unresolved].str.contains(pattern, na=False).to_numpy()
+            result[unresolved[hits]] = category
+            unresolved = unresolved[~hits]
+        
+        return pd.Series(result[codes], index=descriptions.index, dtype=object)
+    
+    def match_one(self, description):
+        """Rule category for a single description"""
+        description = description.lower()
+        for category, pattern in zip(self.categories, self.patterns):
+            if pattern.search(description):
+                return category
+        return None
+
+class FlatForestClassifier(ClassifierMixin, BaseEstimator):
+    """
+    A fitted RandomForestClassifier as a few flat numpy arrays (all trees concatenated).
+    sklearn's Tree objects copy their nodes into private memory when unpickled; these arrays
+    are memory-mapped by ModelStore, so worker processes share one copy of the forest.
+    
+    Batches up to FOREST_FLAT_MAX_ROWS rows (the usual rule misses of a statement) walk the
+    shared arrays. Larger batches are faster in sklearn's compiled trees: the forest is also
+    kept pickled in a (memory-mapped) byte array and unpickled into a private copy the first
+    time a process needs it. Predictions are the same either way. Inference only.
+    """
+    
+    def __init__(self, forest=None):
+        self.forest = forest
+        if forest is None:
+            return
+        lefts, rights, features, thresholds, values, roots = [], [], [], [], [], []
+        offset = 0
+        for tree in forest.estimators_:
+            t = tree.tree_
+            nodes = np.arange(t.node_count)
+            is_leaf = t.children_left == -1
+            # Leaves point to themselves, which marks them for the walk in predict_proba
+            lefts.append(np.where(is_leaf, nodes, t.children_left) + offset)
+            rights.append(np.where(is_leaf, nodes, t.children_right) + offset)
+            features.append(np.where(is_leaf, 0, t.feature))
+            thresholds.append(np.where(is_leaf, np.inf, t.threshold))
+            value = t.value[:, 0, :]
+            values.append(value / value.sum(axis=1, keepdims=True))
+            roots.append(offset)
+            offset += t.node_count
+        
+        self.left_ = np.concatenate(lefts).astype(np.int32)
+        self.right_ = np.concatenate(rights).astype(np.int32)
+        self.feature_ = np.concatenate(features).astype(np.int32)
+        self.threshold_ = np.concatenate(thresholds)
+        self.value_ = np.concatenate(values)
+        self.roots_ = np.array(roots, dtype=np.int32)
+        self.classes_ = forest.classes_
+        self.forest_pickle_ = np.frombuffer(pickle.dumps(forest, protocol=5), dtype=np.uint8)
+        self.forest = None  # Only the arrays are kept (and saved)
+        self._forest = None  # Private copy for large batches, unpickled on first use
+    
+    def fit(self, X, y):
+        raise NotImplementedError("FlatForestClassifier is built from a fitted RandomForestClassifier")
+    
+    def predict_proba(self, X, chunk_size=2048):
+        """Same as RandomForestClassifier.predict_proba"""
+        if X.shape[0] > config.FOREST_FLAT_MAX_ROWS:
+            if getattr(self, '_forest', None) is None:
+                self._forest = pickle.loads(self.forest_pickle_)
+            return self._forest.predict_proba(X)
+        
+        proba = np.empty((X.shape[0], len(self.classes_)))
+        for start in range(0, X.shape[0], chunk_size):
+            chunk = X[start:start + chunk_size]
+            # Trees compare float32 features against their thresholds
+            chunk = chunk.toarray() if sp.issparse(chunk) else np.asarray(chunk)
+            chunk = chunk.astype(np.float32, copy=False)
+            # One walk per (row, tree); only the ones not yet at a leaf take another step
+            node = np.tile(self.roots_, len(chunk))
+            rows = np.repeat(np.arange(len(chunk)), len(self.roots_))
+            active = np.arange(len(node))
+            while len(active):
+                current = node[active]
+                go_left = chunk[rows[active], self.feature_[current]] <= self.threshold_[current]
+                node[active] = np.where(go_left, self.left_[current], self.right_[current])
+                active = active[self.left_[node[active]] != node[active]]
+            proba[start:start + len(chunk)] = self.value_[node].reshape(len(chunk), len(self.roots_), -1).mean(axis=1)
+        return proba
+    
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+def _evaluate_candidate(pipeline, params, X, y):
+    """Search worker: cross-validated F1 and per-row inference cost of one setting"""
+    pipeline = clone(pipeline).set_params(**params)
+    try:
+        scores = cross_validate(pipeline, X, y, cv=config.SEARCH_CV_FOLDS, scoring='f1_weighted')
+    except Exception as e:
+        return {**params, 'f1': np.nan, 'error': str(e)}
+    
+    test_rows = len(X) / config.SEARCH_CV_FOLDS
+    return {
+        **params,
+        'f1': scores['test_score'].mean(),
+        'fit_seconds': scores['fit_time'].mean(),
+        'ms_per_row': scores['score_time'].mean() / test_rows * 1000,
+    }
+
+class CategoryCache:
+    """
+    Bounded LRU cache of (model version, clean_description) -> category.
+    Persisted to disk so warm sessions skip the rule engine and the ML model for known merchants.
+    """
+    
+    def __init__(self, path=config.CATEGORY_CACHE_PATH, max_size=config.CATEGORY_CACHE_SIZE):
+        self.path = path
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'rb') as f:
+                    self.entries = pickle.load(f)
+            except Exception as e:
+                print(f"⚠️ Ignoring unreadable category cache: {e}")
+    
+    def lookup(self, version, descriptions):
+        """Cached category per description (None on a miss)"""
+        results = np.empty(len(descriptions), dtype=object)
+        for i, description in enumerate(descriptions):
+            key = (version, description)
+            category = self.entries.get(key)
+            if category is not None:
+                self.entries.move_to_end(key)
+            results[i] = category
+        
+        found = int(pd.notna(results).sum())
+        self.hits += found
+        self.misses += len(descriptions) - found
+        return results
+    
+    def store(self, version, descriptions, categories):
+        """Add results and evict the least recently used entries above max_size"""
+        for description, category in zip(descriptions, categories):
+            self.entries[(version, description)] = category
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+    
+    def save(self):
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        # Unique temp file: Streamlit sessions are threads of one process and may save at once
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(self.entries, f)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    
+    def get_metrics(self):
+        lookups = self.hits + self.misses
+        return {
+            'cache_hits': self.hits,
+            'cache_misses': self.misses,
+            'cache_hit_rate': self.hits / lookups if lookups else 0.0,
+            'cache_size': len(self.entries),
+        }
 
 class TransactionCategorizer:
-    def __init__(self):
-        # The ML Pipeline: Convert text to numbers (TF-IDF) -> Classify (Random Forest)
-        self.pipeline = Pipeline([
-            ('tfidf', TfidfVectorizer(max_features=1000, stop_words='english')),
-            ('clf', RandomForestClassifier(n_estimators=100, random_state=42))
-        ])
+    def __init__(self, use_cache=True, cascade_threshold=config.CASCADE_THRESHOLD, online=False):
+        self.online = online
+        self.pipeline = self._build_pipeline()
+        # Versioned artifacts, shared across reruns through the process-wide model cache
+        self.store = ModelStore('categorizer_online' if online else 'categorizer')
+        # True while the model object is the shared cached copy (must not be mutated)
+        self._shared_model = False
+        
+        # Fast tier of the ML layer: a linear model over the same TF-IDF features.
+        # Rows it predicts with probability >= cascade_threshold skip the forest.
+        self.linear_clf = None if online else LogisticRegression(max_iter=1000)
+        self.cascade_threshold = cascade_threshold
+        self.tier_metrics = {}
+        self.tier_stats = {'linear': [0, 0.0], 'forest': [0, 0.0]}  # rows, seconds at predict time
         self.is_trained = False
         self.accuracy = 0.0
         self.precision = 0.0
@@ -34,48 +270,89 @@ class TransactionCategorizer:
             'Income': ['salary', 'credit', 'refund', 'cashback', 'interest', 'dividend'],
             'Transfer': ['upi', 'transfer', 'sent', 'paid to'],
         }
+        self._matcher = None
+        self._matcher_key = None
+        
+        # Memoized results per distinct description (persisted between sessions)
+        self.cache = CategoryCache() if use_cache else None
+        self.model_version = 'untrained'
+
+    def _get_matcher(self):
+        """Compile the keyword map once (and again only if keyword_map is edited)"""
+        key = tuple((category, tuple(keywords)) for category, keywords in self.keyword_map.items())
+        if self._matcher is None or key != self._matcher_key:
+            self._matcher = KeywordMatcher(self.keyword_map)
+            self._matcher_key = key
+        return self._matcher
+
+    def _build_pipeline(self):
+        if self.online:
+            # Online mode: stateless hashing features + a partial_fit classifier,
+            # so new labeled rows update the model without retraining on the full history
+            return Pipeline([
+                ('hashing', HashingVectorizer(n_features=config.ONLINE_N_FEATURES, alternate_sign=False, stop_words='english')),
+                ('clf', SGDClassifier(loss='log_loss', random_state=42))
+            ])
+        
+        # The ML Pipeline: Convert text to numbers (TF-IDF) -> Classify (Random Forest)
+        # The forest trains and predicts on all cores (n_jobs=-1)
+        return Pipeline([
+            ('tfidf', TfidfVectorizer(max_features=1000, stop_words='english')),
+            ('clf', RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=config.TRAIN_N_JOBS))
+        ])
+
+    def _cache_version(self):
+        """Cached categories are valid only for the same ML model and the same keyword rules"""
+        self._get_matcher()
+        rules = hashlib.sha256(repr(self._matcher_key).encode()).hexdigest()[:12]
+        return f"{self.model_version}:{rules}:{self.cascade_threshold}"
+
+    def _update_model_version(self, model_bytes=None):
+        """Fingerprint the ML model so cached results from an older model are not reused"""
+        if model_bytes is None:
+            model_bytes = pickle.dumps(self._model_state())
+        self.model_version = hashlib.sha256(model_bytes).hexdigest()[:12]
 
     def _get_keyword_category(self, description):
         """Check if description contains any keyword"""
-        description = description.lower()
-        for category, keywords in self.keyword_map.items():
-            for keyword in keywords:
-                if keyword in description:
-                    return category
-        return None
+        return self._get_matcher().match_one(description)
 
-    def train(self, df):
+    def _get_keyword_categories(self, descriptions):
+        """Vectorized rule layer over a Series of descriptions (None = no keyword)"""
+        return self._get_matcher().match(descriptions)
+
+    def train(self, df, search=False, time_budget=config.SEARCH_TIME_BUDGET):
         """
         Train the model using a mix of Rule-Based labels and Manual labels.
+        search=True first runs a cross-validated hyperparameter search (see search_hyperparameters).
         """
-        print("Training Categorizer...")
+        if self.online:
+            return self.partial_train(df)
         
-        # 1. Auto-label data using rules (Create a 'ground truth' for the ML to learn from)
-        # In a real scenario, you would also load a manually labeled CSV here.
-        train_data = df.copy()
-        
-        # Apply rules to generate labels
-        train_data['category'] = train_data['clean_description'].apply(self._get_keyword_category)
-        
-        # Drop rows where rules couldn't find a category (we can't train on unknowns)
-        train_data = train_data.dropna(subset=['category'])
+        print("Training Categorizer...")
         
-        if len(train_data) < 5:
+        split = self._labeled_split(df)
+        if split is None:
             print("⚠️ Not enough labeled data to train ML model yet. relying on rules only.")
             return
-
-        # 2. Train the ML model with train/test split for accuracy calculation
-        X = train_data['clean_description']
-        y = train_data['category']
-        
-        # Split data for training and testing
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y if len(np.unique(y)) > 1 else None)
+        X_train, X_test, y_train, y_test = split
+        # Kept for distill(), which evaluates on the same held-out split
+        self._split = split
         
-        # Train model
+        # Train model (forest, then the linear tier on the same TF-IDF features)
+        self.pipeline = self._build_pipeline()
+        self._shared_model = False
+        if search:
+            best_params = self.search_hyperparameters(X_train, y_train, time_budget=time_budget)
+            if best_params:
+                self.pipeline.set_params(**best_params)
         self.pipeline.fit(X_train, y_train)
+        self.linear_clf = LogisticRegression(max_iter=1000) if y_train.nunique() > 1 else None
+        if self.linear_clf is not None:
+            self.linear_clf.fit(self.pipeline.named_steps['tfidf'].transform(X_train), y_train)
         
         # Calculate metrics
-        y_pred = self.pipeline.predict(X_test)
+        y_pred = self._evaluate_tiers(X_test, y_test)
         self.accuracy = accuracy_score(y_test, y_pred)
         
         # Calculate precision, recall, f1 with weighted average for imbalanced data
@@ -89,63 +366,405 @@ class TransactionCategorizer:
             self.f1 = self.accuracy
         
         self.is_trained = True
-        print(f"✅ Model trained on {len(train_data)} transactions.")
+        self._update_model_version()
+        print(f"✅ Model trained on {len(X_train) + len(X_test)} transactions.")
         print(f"📊 Model Accuracy: {self.accuracy:.2%} | Precision: {self.precision:.2%} | Recall: {self.recall:.2%} | F1: {self.f1:.2%}")
 
-    def predict(self, df):
+    def search_hyperparameters(self, X, y, time_budget=config.SEARCH_TIME_BUDGET, workers=None):
         """
-        Hybrid Prediction:
-        1. Try Rule Engine
-        2. If Rule fails, use ML Model
+        Cross-validated search over config.SEARCH_GRID in a process pool, under a wall-clock budget.
+        Settings are tried in random order; no new ones start once the budget is spent.
+        The winner has the best F1 per ms of inference, among settings within
+        config.SEARCH_F1_TOLERANCE of the top F1 (so a fast but poor model cannot win).
+        Results are written next to the model artifact (search_results.csv).
         """
-        df = df.copy()
-        predictions = []
-        
-        for _, row in df.iterrows():
-            desc = row['clean_description']
-            
-            # Layer 1: Rules
-            rule_cat = self._get_keyword_category(desc)
-            
-            if rule_cat:
-                predictions.append(rule_cat)
-            
-            # Layer 2: ML Model (only if trained)
-            elif self.is_trained:
+        settings = list(ParameterGrid(config.SEARCH_GRID))
+        candidates = list(np.random.default_rng(42).permutation(len(settings)))
+        workers = workers or os.cpu_count() or 1
+        # Parallelism comes from the pool, so each candidate's forest uses one core
+        base = clone(self._build_pipeline()).set_params(clf__n_jobs=1)
+        
+        print(f"🔎 Searching {len(candidates)} settings with {workers} workers ({time_budget:.0f}s budget)...")
+        deadline = time.perf_counter() + time_budget
+        results, pending = [], set()
+        
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            while candidates or pending:
+                # Keep every worker busy until the budget runs out
+                while candidates and len(pending) < workers and time.perf_counter() < deadline:
+                    index = int(candidates.pop())
+                    future = executor.submit(_evaluate_candidate, base, settings[index], X, y)
+                    future.setting = index
+                    pending.add(future)
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                results.extend({'setting': future.setting, **future.result()} for future in done)
+        
+        results = pd.DataFrame(results)
+        if len(results) == 0 or results['f1'].isna().all():
+            print("⚠️ Hyperparameter search found no usable setting, keeping the defaults.")
+            return None
+        
+        results['f1_per_ms'] = results['f1'] / results['ms_per_row']
+        eligible = results['f1'] >= results['f1'].max() - config.SEARCH_F1_TOLERANCE
+        results['selected'] = False
+        best = results[eligible]['f1_per_ms'].idxmax()
+        results.loc[best, 'selected'] = True
+        results = results.sort_values('f1', ascending=False)
+        
+        os.makedirs(self.store.directory, exist_ok=True)
+        results_path = os.path.join(self.store.directory, 'search_results.csv')
+        results.to_csv(results_path, index=False)
+        
+        best_params = settings[results.loc[best, 'setting']]
+        print(f"✅ Tried {len(results)} settings. Best: {best_params} "
+              f"(F1 {results.loc[best, 'f1']:.2%}, {results.loc[best, 'ms_per_row']:.3f} ms/row)")
+        print(f"   Results saved to {results_path}")
+        return best_params
+
+    def _labeled_split(self, df):
+        """Rule-labeled train/test split (None if there is too little labeled data)"""
+        # 1. Auto-label data using rules (Create a 'ground truth' for the ML to learn from)
+        # In a real scenario, you would also load a manually labeled CSV here.
+        train_data = df.copy()
+        
+        # Apply rules to generate labels
+        train_data['category'] = self._get_keyword_categories(train_data['clean_description'])
+        
+        # Drop rows where rules couldn't find a category (we can't train on unknowns)
+        train_data = train_data.dropna(subset=['category'])
+        
+        if len(train_data) < 5:
+            return None
+
+        # 2. Train the ML model with train/test split for accuracy calculation
+        X = train_data['clean_description'].astype(str)
+        y = train_data['category']
+        
+        # Split data for training and testing
+        return train_test_split(X, y, test_size=0.2, random_state=42, stratify=y if len(np.unique(y)) > 1 else None)
+
+    def distill(self, df=None, max_features=config.DISTILL_MAX_FEATURES, replace=False):
+        """
+        Distill the trained forest into a compact model for low-latency inference:
+        a linear classifier over a pruned TF-IDF vocabulary, fitted to the forest's predictions.
+        Reports artifact size, load time, p50/p99 per-row latency and held-out accuracy of both.
+        replace=True makes the compact model the ML layer (call save() to persist it).
+        """
+        if not self.is_trained or self.online:
+            print("⚠️ Distillation needs a trained forest model.")
+            return None
+        
+        split = self._labeled_split(df) if df is not None else getattr(self, '_split', None)
+        if split is None:
+            print("⚠️ No training split available, pass the training frame to distill().")
+            return None
+        X_train, X_test, y_train, y_test = split
+        
+        # The student learns the teacher's decisions, not just the rule labels
+        teacher = self.pipeline
+        student = Pipeline([
+            ('tfidf', TfidfVectorizer(max_features=max_features, stop_words='english')),
+            ('clf', LogisticRegression(max_iter=1000))
+        ])
+        student.fit(X_train, teacher.predict(X_train))
+        
+        report = pd.DataFrame({
+            name: self._profile_model(model, X_test, y_test)
+            for name, model in [('forest', teacher), ('distilled', student)]
+        })
+        report['change'] = report['distilled'] / report['forest']
+        print("📉 Distillation report:")
+        print(report.to_string(float_format=lambda value: f"{value:,.4f}"))
+        
+        if replace:
+            self.pipeline = student
+            self.linear_clf = None  # The cascade tier was fitted on the old vocabulary
+            self._shared_model = False
+            self._update_model_version()
+            print("✅ Distilled model is now the ML layer.")
+        
+        return report
+
+    def _profile_model(self, model, X_test, y_test):
+        """Artifact size, load time, single-row latency and accuracy of one model"""
+        buffer = io.BytesIO()
+        joblib.dump(model, buffer)
+        size = buffer.tell()
+        
+        buffer.seek(0)
+        start = time.perf_counter()
+        joblib.load(buffer)
+        load_time = time.perf_counter() - start
+        
+        latencies = []
+        for description in X_test.iloc[:config.DISTILL_LATENCY_SAMPLE]:
+            start = time.perf_counter()
+            model.predict([description])
+            latencies.append(time.perf_counter() - start)
+        
+        return {
+            'artifact_bytes': size,
+            'load_seconds': load_time,
+            'p50_latency_ms': np.percentile(latencies, 50) * 1000,
+            'p99_latency_ms': np.percentile(latencies, 99) * 1000,
+            'accuracy': accuracy_score(y_test, model.predict(X_test)),
+        }
+
+    def partial_train(self, df, labels=None, batch_size=config.ONLINE_BATCH_SIZE, save=True):
+        """
+        Online mode: update the model with new labeled rows in mini-batches (partial_fit).
+        labels: optional categories for df (e.g. user corrections), otherwise rule labels are used.
+        Each batch is scored before it is learned (test-then-train), so the metrics come for free.
+        The saved model is updated in place.
+        """
+        if not self.online:
+            raise ValueError("partial_train needs TransactionCategorizer(online=True)")
+        
+        print("Updating Categorizer (online)...")
+        if labels is None:
+            labels = self._get_keyword_categories(df['clean_description'])
+        labeled = pd.DataFrame({'text': df['clean_description'].astype(str).to_numpy(), 'label': np.asarray(labels, dtype=object)})
+        labeled = labeled.dropna(subset=['label'])
+        labeled = labeled[labeled['label'].isin(config.CATEGORIES)]
+        
+        if len(labeled) == 0:
+            print("⚠️ No labeled rows to learn from.")
+            return
+        
+        if self._shared_model:
+            # The loaded model is shared (and memory-mapped read-only), update a private copy
+            self.pipeline = copy.deepcopy(self.pipeline)
+            self._shared_model = False
+        
+        hashing = self.pipeline.named_steps['hashing']
+        clf = self.pipeline.named_steps['clf']
+        y_true, y_pred = [], []
+        
+        for start in range(0, len(labeled), batch_size):
+            batch = labeled.iloc[start:start + batch_size]
+            X = hashing.transform(batch['text'])  # Stateless: no fitting, no vocabulary
+            if hasattr(clf, 'classes_'):
+                y_true.extend(batch['label'])
+                y_pred.extend(clf.predict(X))
+            clf.partial_fit(X, batch['label'], classes=config.CATEGORIES)
+        
+        if y_true:
+            self.accuracy = accuracy_score(y_true, y_pred)
+            self.precision = precision_score(y_true, y_pred, average='weighted', zero_division=0)
+            self.recall = recall_score(y_true, y_pred, average='weighted', zero_division=0)
+            self.f1 = f1_score(y_true, y_pred, average='weighted', zero_division=0)
+        
+        self.is_trained = True
+        self._update_model_version()
+        print(f"✅ Model updated with {len(labeled)} transactions.")
+        if y_true:
+            print(f"📊 Progressive Accuracy: {self.accuracy:.2%} | F1: {self.f1:.2%} (on {len(y_true)} rows before learning them)")
+        
+        if save:
+            self.save()
+
+    def _evaluate_tiers(self, X_test, y_test):
+        """Cascade predictions on the held-out split, with accuracy and throughput per tier"""
+        X = self.pipeline.named_steps['tfidf'].transform(X_test)
+        y_test = np.asarray(y_test)
+        
+        start = time.perf_counter()
+        y_forest = self.pipeline.named_steps['clf'].predict(X)
+        forest_time = time.perf_counter() - start
+        
+        if self.linear_clf is None:
+            self.tier_metrics = {}
+            return y_forest
+        
+        start = time.perf_counter()
+        proba = self.linear_clf.predict_proba(X)
+        linear_time = time.perf_counter() - start
+        
+        fast = proba.max(axis=1) >= self.cascade_threshold
+        y_linear = self.linear_clf.classes_[proba.argmax(axis=1)]
+        y_pred = np.where(fast, y_linear, y_forest)
+        
+        self.tier_metrics = {
+            'linear_share': float(fast.mean()),
+            'linear_accuracy': accuracy_score(y_test[fast], y_linear[fast]) if fast.any() else 0.0,
+            'forest_accuracy': accuracy_score(y_test[~fast], y_forest[~fast]) if (~fast).any() else 0.0,
+            'linear_only_accuracy': accuracy_score(y_test, y_linear),
+            'forest_only_accuracy': accuracy_score(y_test, y_forest),
+            'linear_rows_per_sec': len(y_test) / linear_time if linear_time > 0 else 0.0,
+            'forest_rows_per_sec': len(y_test) / forest_time if forest_time > 0 else 0.0,
+        }
+        return y_pred
+
+    def predict(self, df, rows=None):
+        """
+        Hybrid Prediction (batched cascade):
+        1. Rule Engine, one vectorized pass over all rows
+        2. ML Model, all rule misses in fixed-size batches
+        
+        Returns a Series of categories aligned to df's index.
+        rows: optional boolean mask (e.g. df['is_new'] from IncrementalLoader).
+        Only those rows are categorized, the others keep their existing 'category'.
+        """
+        if rows is not None and 'category' in df.columns:
+            rows = np.asarray(rows, dtype=bool)
+            predictions = df['category'].astype(object)
+            predictions.iloc[np.flatnonzero(rows)] = self.predict(df[rows]).to_numpy()
+            return predictions
+        
+        # Each distinct description is categorized once (or served from the cache)
+        codes, uniques = pd.factorize(df['clean_description'])
+        uniques = pd.Series(uniques, dtype=object)
+        if (codes == -1).any():
+            # Missing descriptions are categorized as empty text
+            codes = np.where(codes == -1, len(uniques), codes)
+            uniques = pd.concat([uniques, pd.Series([''], dtype=object)], ignore_index=True)
+        
+        if self.cache is None:
+            categories = self._categorize(uniques)
+        else:
+            version = self._cache_version()
+            categories = self.cache.lookup(version, uniques)
+            misses = pd.isna(categories)
+            if misses.any():
+                categories[misses] = self._categorize(uniques[misses])
+                self.cache.store(version, uniques[misses], categories[misses])
                 try:
-                    ml_cat = self.pipeline.predict([desc])[0]
-                    predictions.append(ml_cat)
-                except:
-                    predictions.append('Other')
+                    self.cache.save()
+                except Exception as e:
+                    print(f"⚠️ Could not save category cache: {e}")
+        
+        return pd.Series(categories[codes], index=df.index, name='category', dtype=object)
+
+    def _categorize(self, descriptions):
+        """Rules first, then the ML model for the rule misses"""
+        # Layer 1: Rules
+        predictions = self._get_keyword_categories(descriptions)
+        misses = predictions.isna().to_numpy()
+        
+        # Layer 2: ML Model (only if trained)
+        if misses.any():
+            if self.is_trained:
+                predictions[misses] = self._predict_ml(descriptions[misses])
             else:
-                predictions.append('Other')
-                
-        return predictions
+                predictions[misses] = 'Other'
+        
+        return predictions.to_numpy()
+
+    def _predict_ml(self, descriptions):
+        """Run the pipeline over descriptions in batches of config.PREDICT_BATCH_SIZE"""
+        descriptions = descriptions.astype(str).to_numpy()
+        results = np.empty(len(descriptions), dtype=object)
+        
+        for start in range(0, len(descriptions), config.PREDICT_BATCH_SIZE):
+            batch = slice(start, start + config.PREDICT_BATCH_SIZE)
+            try:
+                results[batch] = self._predict_cascade(descriptions[batch])
+            except Exception as e:
+                print(f"⚠️ ML prediction failed for a batch: {e}")
+                results[batch] = 'Other'
+        
+        return results
+
+    def _predict_cascade(self, descriptions):
+        """Linear tier for confident rows, RandomForest only for the rest"""
+        if self.linear_clf is None or not hasattr(self.linear_clf, 'classes_'):
+            start = time.perf_counter()
+            results = self.pipeline.predict(descriptions)
+            self._record_tier('forest', len(descriptions), time.perf_counter() - start)
+            return results
+        
+        X = self.pipeline.named_steps['tfidf'].transform(descriptions)
+        
+        start = time.perf_counter()
+        proba = self.linear_clf.predict_proba(X)
+        results = self.linear_clf.classes_[proba.argmax(axis=1)].astype(object)
+        uncertain = proba.max(axis=1) < self.cascade_threshold
+        self._record_tier('linear', len(descriptions), time.perf_counter() - start)
+        
+        if uncertain.any():
+            start = time.perf_counter()
+            results[uncertain] = self.pipeline.named_steps['clf'].predict(X[uncertain])
+            self._record_tier('forest', int(uncertain.sum()), time.perf_counter() - start)
+        
+        return results
+
+    def _record_tier(self, tier, rows, seconds):
+        self.tier_stats[tier][0] += rows
+        self.tier_stats[tier][1] += seconds
 
     def get_metrics(self):
         """Return model performance metrics."""
+        linear_rows, linear_time = self.tier_stats['linear']
+        forest_rows, forest_time = self.tier_stats['forest']
         return {
             'accuracy': self.accuracy,
             'precision': self.precision,
             'recall': self.recall,
             'f1': self.f1,
-            'is_trained': self.is_trained
+            'is_trained': self.is_trained,
+            # Cascade: held-out accuracy per tier, plus live throughput from predict()
+            'cascade_threshold': self.cascade_threshold,
+            **self.tier_metrics,
+            'linear_predicted_rows': linear_rows,
+            'forest_predicted_rows': forest_rows,
+            'linear_live_rows_per_sec': linear_rows / linear_time if linear_time > 0 else 0.0,
+            'forest_live_rows_per_sec': forest_rows / forest_time if forest_time > 0 else 0.0,
+            **(self.cache.get_metrics() if self.cache is not None else {})
         }
 
+    def _model_state(self):
+        """Everything the ML layer needs, as saved to disk"""
+        pipeline = self.pipeline
+        if isinstance(pipeline.named_steps.get('clf'), RandomForestClassifier):
+            # Flat node arrays instead of Tree objects, so loads memory-map the forest
+            pipeline = Pipeline([('tfidf', pipeline.named_steps['tfidf']),
+                                 ('clf', FlatForestClassifier(pipeline.named_steps['clf']))])
+        return {'pipeline': pipeline, 'linear_clf': self.linear_clf}
+
+    def _set_model_state(self, state):
+        # Older artifacts hold just the forest pipeline (no linear tier)
+        if isinstance(state, Pipeline):
+            state = {'pipeline': state, 'linear_clf': None}
+        self.pipeline = state['pipeline']
+        self.linear_clf = state['linear_clf']
+
     def save(self):
-        """Save the trained model to disk"""
-        path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'models', 'categorizer.pkl')
-        with open(path, 'wb') as f:
-            pickle.dump(self.pipeline, f)
-        print("💾 Model saved.")
-
-    def load(self):
-        """Load the model from disk"""
-        path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'models', 'categorizer.pkl')
-        if os.path.exists(path):
-            with open(path, 'rb') as f:
-                self.pipeline = pickle.load(f)
-            self.is_trained = True
-            print("✅ Model loaded.")
+        """Save the trained model to disk as a new versioned artifact"""
+        version = self.store.save(self._model_state(), metadata={
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'online': self.online,
+            'metrics': {key: float(getattr(self, key)) for key in ['accuracy', 'precision', 'recall', 'f1']},
+        })
+        print(f"💾 Model saved (version {version}).")
+        return version
+
+    def load(self, version=None):
+        """Load the model from disk (latest version by default, cached per process)"""
+        state, version = self.store.load(version)
+        
+        if state is not None:
+            self._set_model_state(state)
+            self.model_version = version
+            self._shared_model = True
+        elif not self.online and os.path.exists(config.CATEGORIZER_PATH):
+            # Legacy single-file pickle: move it into the store once, so later loads
+            # (every Streamlit rerun) are served from the process-wide cache
+            with open(config.CATEGORIZER_PATH, 'rb') as f:
+                model_bytes = f.read()
+            self._set_model_state(pickle.loads(model_bytes))
+            try:
+                self.save()
+            except OSError as e:
+                print(f"⚠️ Could not move the legacy model into the model store: {e}")
+                self._update_model_version(model_bytes)
+            else:
+                print("📦 Legacy model moved into the model store.")
+                return self.load()
         else:
-            print("⚠️ No saved model found.")
\ No newline at end of file
+            print("⚠️ No saved model found.")
+            return
+        
+        self.is_trained = True
+        print("✅ Model loaded.")
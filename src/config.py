@@ -5,10 +5,121 @@ import os
 DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
 RAW_DATA_PATH = os.path.join(DATA_DIR, 'raw')
 PROCESSED_DATA_PATH = os.path.join(DATA_DIR, 'processed')
+CACHE_DIR = os.path.join(DATA_DIR, 'cache')
+DEDUP_INDEX_PATH = os.path.join(PROCESSED_DATA_PATH, 'dedup_index_v3.bin')  # sorted fingerprints, then their statement ids
+INCREMENTAL_STORE_PATH = os.path.join(PROCESSED_DATA_PATH, 'store')
 
 # Data Schema
 REQUIRED_COLUMNS = ['date', 'description', 'amount', 'type']
 DATE_FORMAT = '%Y-%m-%d'
+TRANSACTION_TYPES = ['debit', 'credit']
+MONEY_COLUMNS = ['amount', 'balance']  # Kept at int64 / float64 by the compact schema (exact totals)
+
+# Date Parsing
+# Candidate formats for auto-detection, tried in order (ties go to the earlier one,
+# so day-first formats win over month-first for ambiguous dates like 03/04/2024)
+DATE_FORMATS = [
+    DATE_FORMAT,
+    '%d/%m/%Y',
+    '%d-%m-%Y',
+    '%d.%m.%Y',
+    '%d/%m/%y',
+    '%d-%m-%y',
+    '%d %b %Y',
+    '%d-%b-%Y',
+    '%d-%b-%y',
+    '%Y/%m/%d',
+    '%m/%d/%Y',
+    '%Y-%m-%d %H:%M:%S',
+]
+# Per-bank statement date formats (DataLoader(bank=...) skips detection)
+BANK_DATE_FORMATS = {
+    'hdfc': '%d/%m/%y',
+    'icici': '%d/%m/%Y',
+    'sbi': '%d %b %Y',
+    'axis': '%d-%m-%Y',
+    'kotak': '%d-%m-%Y',
+}
+DATE_SAMPLE_SIZE = 500  # Distinct date strings used to detect the format
+DATE_MIN_COVERAGE = 0.9  # Share of the sample a format must parse to be trusted for the whole file
+
+# Streaming Ingestion
+CHUNK_SIZE = 100_000  # Rows per chunk when streaming large statements
+
+# Processed-Data Cache
+CACHE_MAX_BYTES = 500 * 1024 * 1024  # Evict least recently used entries above this size
+PREPROCESS_VERSION = 2  # Bump when preprocessing output changes to invalidate the cache
+
+# Categorizer
+PREDICT_BATCH_SIZE = 50_000  # Rule misses sent to the ML model per call
+FOREST_FLAT_MAX_ROWS = 64  # Loaded forests walk their shared flat arrays up to this many rows
+MODELS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'models')
+CATEGORIZER_PATH = os.path.join(MODELS_DIR, 'categorizer.pkl')  # Legacy single-file model
+MODEL_STORE_KEEP = 3  # Versions kept per model in models/<name>/
+MODEL_CACHE_SIZE = 8  # Loaded artifacts kept in memory per process (LRU)
+CATEGORY_CACHE_PATH = os.path.join(MODELS_DIR, 'category_cache.pkl')
+CATEGORY_CACHE_SIZE = 100_000  # Distinct descriptions kept (LRU)
+CASCADE_THRESHOLD = 0.8  # Linear-tier confidence needed to skip the RandomForest
+ONLINE_N_FEATURES = 2 ** 16  # Hashing space of the online categorizer
+ONLINE_BATCH_SIZE = 5_000  # Rows per partial_fit mini-batch
+DISTILL_MAX_FEATURES = 300  # Vocabulary kept by the distilled model
+DISTILL_LATENCY_SAMPLE = 200  # Held-out rows timed one by one for p50/p99 latency
+
+# Categorizer Training
+TRAIN_N_JOBS = -1  # Cores used by the RandomForest (-1 = all)
+SEARCH_TIME_BUDGET = 120  # Seconds of wall-clock time for the hyperparameter search
+SEARCH_CV_FOLDS = 3
+SEARCH_F1_TOLERANCE = 0.01  # Candidates this close to the best F1 compete on inference cost
+SEARCH_GRID = {
+    'tfidf__max_features': [300, 1000, 3000],
+    'tfidf__ngram_range': [(1, 1), (1, 2)],
+    'clf__n_estimators': [25, 50, 100],
+    'clf__max_depth': [None, 30],
+}
+
+# Anomaly Detection
+# Batches up to this size are scored with the flattened forest (no per-call sklearn overhead);
+# larger batches go through IsolationForest.score_samples
+ANOMALY_FLAT_MAX_ROWS = 256
+# Training cost stays flat as history grows: trees are fitted on, and the threshold placed from,
+# a random sample of at most ANOMALY_SAMPLE_SIZE rows; each tree sees ANOMALY_MAX_SAMPLES of them
+# ('auto' = min(256, rows)) and trees are built on all cores.
+# update() grows the forest by ANOMALY_UPDATE_TREES trees.
+ANOMALY_N_JOBS = -1
+ANOMALY_MAX_SAMPLES = 'auto'
+ANOMALY_SAMPLE_SIZE = 200_000
+ANOMALY_UPDATE_TREES = 20
+# Groups (categories, accounts) with fewer rows than this use the global model
+ANOMALY_MIN_GROUP_SIZE = 100
+# Behavioural features: "days since merchant last seen" for a first-ever merchant,
+# and how many feature sets (train + predict frames) are kept in memory
+ANOMALY_UNSEEN_DAYS = 365
+ANOMALY_FEATURE_CACHE_SIZE = 4
+# Streaming detector: weight of each new transaction in the running statistics,
+# robust z-score that raises an alert, and observations needed before a group can alert
+STREAM_ALPHA = 0.05
+STREAM_THRESHOLD = 3.5
+STREAM_MIN_COUNT = 10
+# Smallest scale of log(amount) a group is judged with: fixed charges (rent, subscriptions)
+# have zero spread, and 0.1 means a change of ~40% (3.5 * 0.1 in log space) still alerts
+STREAM_MIN_SCALE = 0.1
+
+# Forecasting
+SARIMA_ORDER = (1, 1, 1)  # (p, d, q)
+SARIMA_SEASONAL_ORDER = (1, 1, 1, 7)  # (P, D, Q, s)
+SARIMA_MAXITER = 100
+FORECAST_HORIZON = 30  # Days
+FORECAST_SEED = 42  # Day-to-day variation of the moving-average fallback
+# ExpensePredictor.update(): new days extend the fitted model with fixed parameters; a full
+# (warm-started) refit runs every SARIMA_REFIT_DAYS days, or once the mean squared standardized
+# one-step error of the new days (~1 for a good fit) exceeds SARIMA_DRIFT_THRESHOLD
+SARIMA_REFIT_DAYS = 30
+SARIMA_DRIFT_THRESHOLD = 4.0
+SARIMA_DRIFT_MIN_DAYS = 7
+# Fitted SARIMA parameters + forecasts, keyed by series hash and orders
+FORECAST_CACHE_DIR = os.path.join(CACHE_DIR, 'sarima')
+FORECAST_CACHE_SIZE = 16  # Entries kept in memory
+FORECAST_CACHE_MAX_BYTES = 20 * 1024 * 1024  # On disk, least recently used evicted above this
 
 # Transaction Categories (Classes for ML)
 CATEGORIES = [
@@ -1,11 +1,135 @@
 import pandas as pd
 import numpy as np
 import re
+import os
+import json
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from . import config
+from .cache import ProcessedCache, PARQUET_AVAILABLE, file_digest
+
+# Compiled once, shared by the vectorized description cleaner
+NON_ALPHA_PATTERN = re.compile(r'[^a-z\s]')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+def row_fingerprints(df):
+    """
+    64-bit fingerprint per transaction from its normalized date, amount, type and clean_description.
+    Identical rows inside one statement are real (two coffees on the same day), so repeats are
+    numbered per source file: an overlapping download reproduces the same n-th copy and hash.
+    """
+    keys = pd.DataFrame({
+        'date': df['date'].dt.normalize(),
+        'amount': df['amount'].astype('float64').round(2),
+        'type': df['type'].astype(str),
+        'clean_description': df['clean_description'].astype(str),
+    })
+    group_keys = [keys[col] for col in keys.columns]
+    if 'source' in df.columns:
+        group_keys.append(df['source'].astype(str))
+    keys['occurrence'] = keys.groupby(group_keys, sort=False).cumcount()
+    
+    return pd.util.hash_pandas_object(keys, index=False).to_numpy()
+
+def source_id(source):
+    """64-bit id of a statement file's raw content (path or file-like object)"""
+    return np.uint64(int(file_digest(source)[:16], 16))
+
+class Deduplicator:
+    """
+    Drops transactions that were already ingested, e.g. from overlapping monthly downloads.
+    Each kept row's fingerprint goes into a persistent index together with the id of the
+    statement it came from. The index file holds the sorted fingerprints followed by their
+    statement ids (uint64), memory-mapped and binary-searched, so an upload is checked in
+    O(log n) per row without reading the history. Re-loading the same statement (a Streamlit
+    rerun) keeps its own rows; only rows first imported from another statement are dropped.
+    """
+    
+    def __init__(self, index_path=config.DEDUP_INDEX_PATH):
+        # index_path=None keeps the index in memory only
+        self.index_path = index_path
+        self.fingerprints = np.empty(0, dtype=np.uint64)  # sorted
+        self.sources = np.empty(0, dtype=np.uint64)  # id of the statement that first contributed each one
+        self.num_dropped = 0
+        
+        if index_path and os.path.exists(index_path) and os.path.getsize(index_path):
+            index = np.memmap(index_path, dtype=np.uint64, mode='r')
+            n = len(index) // 2
+            self.fingerprints, self.sources = index[:n], index[n:]
+    
+    def _lookup(self, fingerprints):
+        """Whether each fingerprint is in the index, and its statement id where it is"""
+        if len(self.fingerprints) == 0:
+            return np.zeros(len(fingerprints), dtype=bool), np.zeros(len(fingerprints), dtype=np.uint64)
+        positions = np.minimum(np.searchsorted(self.fingerprints, fingerprints), len(self.fingerprints) - 1)
+        return self.fingerprints[positions] == fingerprints, self.sources[positions]
+    
+    def drop_duplicates(self, df, commit=True, sources=0):
+        """
+        Return df without rows imported before from another statement
+        (or repeated within df across sources).
+        sources: statement id per row, or one id for the whole frame (see source_id()).
+        """
+        if df is None or len(df) == 0:
+            self.num_dropped = 0
+            return df
+        
+        fingerprints = row_fingerprints(df)
+        sources = np.broadcast_to(np.asarray(sources, dtype=np.uint64), fingerprints.shape)
+        found, known_sources = self._lookup(fingerprints)
+        is_duplicate = found & (known_sources != sources)
+        is_duplicate |= pd.Series(fingerprints).duplicated().to_numpy()
+        
+        self.num_dropped = int(is_duplicate.sum())
+        print(f"🧹 Dropped {self.num_dropped} duplicate transactions ({len(df) - self.num_dropped} new).")
+        
+        if commit:
+            self.add(fingerprints[~is_duplicate], sources[~is_duplicate])
+        
+        return df[~is_duplicate]
+    
+    def add(self, fingerprints, sources=0):
+        """Record fingerprints in the index (the first statement to contribute one keeps it)"""
+        fingerprints = np.asarray(fingerprints, dtype=np.uint64)
+        sources = np.broadcast_to(np.asarray(sources, dtype=np.uint64), fingerprints.shape)
+        fingerprints, first = np.unique(fingerprints, return_index=True)
+        sources = sources[first]
+        new = ~self._lookup(fingerprints)[0]
+        if not new.any():
+            return
+        
+        # Merge the (sorted) new entries into the sorted index
+        positions = np.searchsorted(self.fingerprints, fingerprints[new])
+        self.fingerprints = np.insert(self.fingerprints, positions, fingerprints[new])
+        self.sources = np.insert(self.sources, positions, sources[new])
+        if self.index_path:
+            directory = os.path.dirname(self.index_path) or '.'
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                np.concatenate([self.fingerprints, self.sources]).tofile(f)
+            os.replace(tmp_path, self.index_path)
+
+def _load_statement(path, compact, bank, use_cache):
+    """Worker for DataLoader.load_many (module level so it can be pickled)"""
+    df = DataLoader(path, compact=compact, bank=bank).load_processed(use_cache=use_cache)
+    if df is not None:
+        # Uploaded files (file-like objects) carry their name
+        df['source'] = str(getattr(path, 'name', path))
+    return df
 
 class DataLoader:
-    def __init__(self, file_path):
+    def __init__(self, file_path, compact=False, bank=None):
         self.file_path = file_path
+        # Opt-in compact schema (categoricals + narrowed numerics), see to_compact()
+        self.compact = compact
+        # Known bank -> date format from config.BANK_DATE_FORMATS, otherwise auto-detected
+        self.bank = bank.lower() if bank else None
+        self.date_format = config.BANK_DATE_FORMATS.get(self.bank)
+        # Rows dropped because their date could not be parsed
+        self.date_errors = None
+        # Rows dropped by load_processed(dedupe=True)
+        self.num_duplicates = 0
         self.df = None
 
     def load_data(self):
@@ -25,31 +149,268 @@ class DataLoader:
             print(f"❌ Error loading data: {e}")
             return None
 
+    def load_processed(self, use_cache=True, dedupe=False, index_path=config.DEDUP_INDEX_PATH):
+        """
+        Load and preprocess in one step.
+        If this exact file was processed before, the cached columns are loaded
+        directly and load_data/preprocess_data are skipped.
+        dedupe=True drops rows already imported from another statement (persistent index).
+        """
+        # Identify the statement before reading it (uploads are consumed by read_csv)
+        source = source_id(self.file_path) if dedupe else None
+        df = self._load_processed(use_cache)
+        if dedupe and df is not None:
+            deduplicator = Deduplicator(index_path=index_path)
+            df = deduplicator.drop_duplicates(df, sources=source).reset_index(drop=True)
+            self.num_duplicates = deduplicator.num_dropped
+            self.df = df
+        return df
+
+    def _load_processed(self, use_cache):
+        cache = ProcessedCache() if use_cache and PARQUET_AVAILABLE else None
+        
+        if cache is not None:
+            try:
+                schema = 'compact' if self.compact else 'full'
+                key = file_digest(self.file_path, salt=f"v{config.PREPROCESS_VERSION}-{schema}-{self.bank}")
+            except (OSError, TypeError):
+                # Unreadable source: let load_data report the error
+                cache = None
+        
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                self.df = cached
+                print(f"⚡ Loaded processed data from cache. Shape: {cached.shape}")
+                return cached
+        
+        if self.load_data() is None:
+            return None
+        df = self.preprocess_data()
+        
+        if cache is not None and df is not None:
+            try:
+                cache.put(key, df)
+            except Exception as e:
+                print(f"⚠️ Could not cache processed data: {e}")
+        
+        return df
+
+    @classmethod
+    def load_many(cls, paths, workers=None, compact=False, bank=None, use_cache=True, dedupe=False,
+                  index_path=config.DEDUP_INDEX_PATH):
+        """
+        Load and preprocess many statement files in a process pool.
+        Returns one date-sorted frame with a 'source' column naming the file of each row.
+        dedupe=True drops rows repeated across overlapping statements, and rows imported
+        earlier from other statements (persistent index; index_path=None for this call only).
+        """
+        paths = list(paths)
+        # Identify each statement before reading it (uploads are consumed by read_csv)
+        source_ids = [source_id(path) for path in paths] if dedupe else [None] * len(paths)
+        workers = min(workers or os.cpu_count() or 1, max(len(paths), 1))
+        args = (paths, [compact] * len(paths), [bank] * len(paths), [use_cache] * len(paths))
+        
+        if workers == 1:
+            frames = list(map(_load_statement, *args))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                frames = list(executor.map(_load_statement, *args, chunksize=max(len(paths) // (workers * 4), 1)))
+        
+        failed = [path for path, frame in zip(paths, frames) if frame is None]
+        if failed:
+            print(f"⚠️ Skipped {len(failed)} unreadable statements: {failed[:3]}")
+        
+        loaded = [(source, frame) for source, frame in zip(source_ids, frames) if frame is not None]
+        if not loaded:
+            return None
+        frames = [frame for _, frame in loaded]
+        
+        df = pd.concat(frames, ignore_index=True)
+        if dedupe:
+            sources = np.concatenate([np.full(len(frame), source, dtype=np.uint64) for source, frame in loaded])
+            df = Deduplicator(index_path=index_path).drop_duplicates(df, sources=sources)
+        df = df.sort_values('date', kind='stable').reset_index(drop=True)
+        if compact:
+            # Per-file categoricals have different categories, re-encode the merged frame
+            df = cls(None).to_compact(df)
+        
+        print(f"✅ Loaded {len(frames)} statements with {workers} workers. Shape: {df.shape}")
+        return df
+
     def preprocess_data(self):
         """Clean dates, descriptions, and amounts"""
         if self.df is None:
             return None
         
-        df = self.df.copy()
+        df = self._preprocess_frame(self.df.copy())
+        
+        self.df = df
+        return df
 
+    def iter_chunks(self, chunksize=config.CHUNK_SIZE):
+        """
+        Streaming mode: read the CSV in chunks and yield preprocessed frames.
+        Peak memory depends on chunksize instead of the size of the file.
+        """
+        reader = pd.read_csv(self.file_path, chunksize=chunksize)
+        
+        for i, chunk in enumerate(reader):
+            # Every chunk shares the header, so validating the first one is enough
+            if i == 0:
+                missing_cols = [col for col in config.REQUIRED_COLUMNS if col not in chunk.columns]
+                if missing_cols:
+                    raise ValueError(f"Missing required columns: {missing_cols}")
+            
+            yield self._preprocess_frame(chunk)
+
+    def stream_to_processed(self, filename='processed_data.csv', chunksize=config.CHUNK_SIZE):
+        """Preprocess the file chunk by chunk, appending each chunk to the processed folder"""
+        os.makedirs(config.PROCESSED_DATA_PATH, exist_ok=True)
+        save_path = f"{config.PROCESSED_DATA_PATH}/{filename}"
+        
+        total_rows = 0
+        for i, chunk in enumerate(self.iter_chunks(chunksize=chunksize)):
+            chunk.to_csv(save_path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+            total_rows += len(chunk)
+        
+        print(f"💾 Streamed {total_rows} processed rows to: {save_path}")
+        return total_rows
+
+    def _preprocess_frame(self, df):
+        """Apply the cleaning steps to a single frame (a whole file or one chunk)"""
         # 1. Standardize Dates
-        # Coerce errors to NaT, then drop invalid rows
-        df['date'] = pd.to_datetime(df['date'], errors='coerce')
-        df = df.dropna(subset=['date'])
+        # Parse with one explicit format, then report and drop invalid rows
+        parsed = self._parse_dates(df['date'])
+        failed = parsed.isna()
+        if failed.any():
+            self._report_date_errors(df[failed])
+        df['date'] = parsed
+        df = df[~failed]
 
         # 2. Standardize Amounts
         # Ensure absolute values (no negative numbers for expenses)
         df['amount'] = pd.to_numeric(df['amount'], errors='coerce').abs()
         
         # 3. Clean Descriptions (Crucial for ML!)
-        df['clean_description'] = df['description'].apply(self._clean_text)
+        df['clean_description'] = self._clean_descriptions(df['description'])
         
         # 4. Standardize Type
         df['type'] = df['type'].str.lower().str.strip()
         
-        self.df = df
+        if self.compact:
+            df = self.to_compact(df)
+        
+        return df
+
+    def _parse_dates(self, dates):
+        """Parse a date column with the bank's format, detecting it once from a sample if unknown"""
+        if pd.api.types.is_datetime64_any_dtype(dates):
+            return dates
+        
+        if self.date_format is None:
+            self.date_format = self._detect_date_format(dates)
+            if self.date_format is not None:
+                print(f"📅 Detected date format: {self.date_format}")
+        
+        if self.date_format is None:
+            # No single format in the registry fits, fall back to per-element inference
+            print("⚠️ Could not detect a date format for the whole file, inferring per row (slow).")
+            return pd.to_datetime(dates, errors='coerce', format='mixed')
+        
+        return pd.to_datetime(dates.astype(str).str.strip(), format=self.date_format, errors='coerce')
+
+    def _detect_date_format(self, dates):
+        """
+        Pick the candidate format that parses the largest share of a sample of the column.
+        Returns None (per-row inference) unless it covers at least DATE_MIN_COVERAGE of the sample,
+        so a file with mixed layouts is not parsed with a format that drops most of its rows.
+        """
+        sample = pd.Series(dates.dropna().astype(str).str.strip().unique()[:config.DATE_SAMPLE_SIZE])
+        if len(sample) == 0:
+            return None
+        
+        best_format, best_score = None, 0.0
+        for fmt in config.DATE_FORMATS:
+            score = pd.to_datetime(sample, format=fmt, errors='coerce').notna().mean()
+            if score > best_score:
+                best_format, best_score = fmt, score
+                if score == 1.0:
+                    break
+        
+        if best_score < config.DATE_MIN_COVERAGE:
+            return None
+        return best_format
+
+    def _report_date_errors(self, rows):
+        """Keep rows with unparseable dates for inspection instead of dropping them silently"""
+        self.date_errors = rows if self.date_errors is None else pd.concat([self.date_errors, rows])
+        print(f"⚠️ Dropped {len(rows)} rows with unparseable dates (see DataLoader.date_errors). "
+              f"Examples: {rows['date'].astype(str).head(3).tolist()}")
+
+    def to_compact(self, df):
+        """
+        Convert a processed frame to the compact in-memory schema:
+        - type / category: categoricals over the known values from config
+        - description / clean_description / source: dictionary-encoded categoricals
+        - numeric columns: narrowed, except money (amount, balance), which stays int64 / float64
+        Can also be called after categorization to compact the 'category' column.
+        """
+        df = df.copy()
+        
+        if 'type' in df.columns:
+            df['type'] = self._to_categorical(df['type'], config.TRANSACTION_TYPES)
+        if 'category' in df.columns:
+            df['category'] = self._to_categorical(df['category'], config.CATEGORIES)
+        
+        for col in ['description', 'clean_description', 'source']:
+            if col in df.columns:
+                df[col] = df[col].astype('category')
+        
+        # Money is summed into totals: int16 wraps and float32 sums drift by rupees over many rows
+        numeric = [col for col in df.select_dtypes(include='number').columns if col not in config.MONEY_COLUMNS]
+        for col in numeric:
+            if pd.api.types.is_integer_dtype(df[col]):
+                df[col] = pd.to_numeric(df[col], downcast='integer')
+            elif pd.api.types.is_float_dtype(df[col]):
+                narrow = df[col].astype('float32')
+                # Keep float64 unless every value survives the round trip to 2 decimals
+                if ((narrow.astype('float64') - df[col]).abs() < 0.005).all() or df[col].isna().all():
+                    df[col] = narrow
+        
         return df
 
+    def _to_categorical(self, values, known):
+        """Categorical with the configured values first, plus any unexpected ones seen in the data"""
+        extra = sorted(set(values.dropna().unique()) - set(known))
+        return pd.Categorical(values, categories=list(known) + extra)
+
+    def memory_report(self, df=None):
+        """Compare the memory footprint of the full and compact schemas"""
+        df = self.df if df is None else df
+        if df is None or len(df) == 0:
+            return None
+        
+        full = df.copy()
+        for col in full.select_dtypes(include='category').columns:
+            full[col] = full[col].astype(object)
+        compact = self.to_compact(full)
+        
+        report = pd.DataFrame({
+            'full_bytes': full.memory_usage(deep=True, index=False),
+            'compact_bytes': compact.memory_usage(deep=True, index=False),
+            'full_dtype': full.dtypes.astype(str),
+            'compact_dtype': compact.dtypes.astype(str),
+        })
+        
+        full_total = report['full_bytes'].sum()
+        compact_total = report['compact_bytes'].sum()
+        print(f"📦 Full schema:    {full_total / len(df):,.0f} bytes/row ({full_total / 1e6:,.2f} MB)")
+        print(f"📦 Compact schema: {compact_total / len(df):,.0f} bytes/row ({compact_total / 1e6:,.2f} MB)")
+        print(f"   Saved {1 - compact_total / full_total:.1%} of memory")
+        
+        return report
+
     def _clean_text(self, text):
         """
         Removes numbers, special chars, and extra spaces.
@@ -65,9 +426,161 @@ class DataLoader:
         text = ' '.join(text.split())
         return text
 
+    def _clean_descriptions(self, descriptions):
+        """
+        Vectorized version of _clean_text for a whole column.
+        Bank descriptions repeat heavily, so each distinct raw description
+        is cleaned once and the results are mapped back via factorize codes.
+        """
+        codes, uniques = pd.factorize(descriptions)
+        uniques = pd.Series(uniques, dtype=object)
+        
+        # Non-string values clean to "" (same as _clean_text)
+        cleaned = pd.Series("", index=uniques.index, dtype=object)
+        is_text = uniques.map(lambda value: isinstance(value, str)).astype(bool)
+        if is_text.any():
+            cleaned[is_text] = (
+                uniques[is_text]
+                .str.lower()
+                .str.replace(NON_ALPHA_PATTERN, ' ', regex=True)
+                .str.replace(WHITESPACE_PATTERN, ' ', regex=True)
+                .str.strip()
+            )
+        
+        # factorize marks missing values with code -1, which maps to the trailing ""
+        lookup = np.append(cleaned.to_numpy(dtype=object), "")
+        return pd.Series(lookup[codes], index=descriptions.index)
+
     def save_processed(self, filename='processed_data.csv'):
         """Saves cleaned data to processed folder"""
         if self.df is not None:
+            os.makedirs(config.PROCESSED_DATA_PATH, exist_ok=True)
             save_path = f"{config.PROCESSED_DATA_PATH}/{filename}"
             self.df.to_csv(save_path, index=False)
-            print(f"💾 Processed data saved to: {save_path}")
\ No newline at end of file
+            print(f"💾 Processed data saved to: {save_path}")
+
+
+class IncrementalLoader:
+    """
+    Incremental ingestion around DataLoader.
+    Only rows past the stored watermark (last date + fingerprints of the rows on that date)
+    are preprocessed. commit() appends them as a new Parquet part and advances the watermark.
+    """
+
+    def __init__(self, file_path, store_dir=config.INCREMENTAL_STORE_PATH, **loader_kwargs):
+        if not PARQUET_AVAILABLE:
+            raise ImportError("Incremental mode needs pyarrow for the Parquet store (pip install pyarrow)")
+        
+        self.loader = DataLoader(file_path, **loader_kwargs)
+        self.store_dir = store_dir
+        self.watermark_path = os.path.join(store_dir, 'watermark.json')
+        self.watermark = self._read_watermark()
+        self.new_rows = None
+        self._pending_watermark = None
+
+    def _read_watermark(self):
+        if not os.path.exists(self.watermark_path):
+            return None
+        with open(self.watermark_path) as f:
+            watermark = json.load(f)
+        return {
+            'last_date': pd.Timestamp(watermark['last_date']),
+            'fingerprints': set(watermark['fingerprints']),
+        }
+
+    def _part_paths(self):
+        if not os.path.isdir(self.store_dir):
+            return []
+        return sorted(
+            os.path.join(self.store_dir, name)
+            for name in os.listdir(self.store_dir) if name.endswith('.parquet')
+        )
+
+    def load_new(self):
+        """Preprocess and return only the rows past the watermark"""
+        raw = self.loader.load_data()
+        if raw is None:
+            return None
+        
+        if self.watermark is not None:
+            # Cheap date pass first, so older rows are never cleaned at all
+            dates = self.loader._parse_dates(raw['date']).dt.normalize()
+            # Unparseable dates stay in, so preprocessing still reports them
+            raw = raw[dates.isna() | (dates >= self.watermark['last_date'])]
+        
+        new = self.loader._preprocess_frame(raw.copy())
+        if len(new) == 0:
+            self.new_rows, self._pending_watermark = new, None
+            print("📥 0 new transactions past the watermark.")
+            return new
+        
+        # Fingerprints use this file's own numbering of same-day repeats
+        fingerprints = row_fingerprints(new)
+        days = new['date'].dt.normalize().to_numpy()
+        
+        if self.watermark is not None:
+            # Rows on the watermark date itself may already be stored
+            on_edge = days == self.watermark['last_date']
+            stored = np.fromiter(
+                (fp in self.watermark['fingerprints'] for fp in fingerprints.tolist()),
+                dtype=bool, count=len(new),
+            )
+            new = new[~(on_edge & stored)]
+        
+        # Watermark to record once these rows are committed
+        last_date = pd.Timestamp(days.max())
+        edge_fingerprints = set(fingerprints[days == last_date].tolist())
+        if self.watermark is not None and self.watermark['last_date'] == last_date:
+            edge_fingerprints |= self.watermark['fingerprints']
+        self._pending_watermark = {'last_date': last_date, 'fingerprints': edge_fingerprints}
+        
+        self.new_rows = new.reset_index(drop=True)
+        print(f"📥 {len(self.new_rows)} new transactions past the watermark.")
+        return self.new_rows
+
+    def load_history(self):
+        """All rows committed to the store so far"""
+        parts = self._part_paths()
+        if not parts:
+            return None
+        return pd.concat([pd.read_parquet(path) for path in parts], ignore_index=True)
+
+    def load(self):
+        """
+        History plus the new rows, with an 'is_new' column marking rows past the watermark.
+        Pass df['is_new'] to the categorizer / anomaly / insight stages to limit their work.
+        """
+        new = self.load_new() if self.new_rows is None else self.new_rows
+        if new is None:
+            return None
+        
+        history = self.load_history()
+        frames = [] if history is None else [history.assign(is_new=False)]
+        frames.append(new.assign(is_new=True))
+        return pd.concat(frames, ignore_index=True)
+
+    def commit(self, new_rows=None):
+        """
+        Append the rows from load_new() to the store and advance the watermark.
+        Pass them back enriched (e.g. with category / anomaly columns) to store those too.
+        """
+        new = self.new_rows if new_rows is None else new_rows
+        if new is None or len(new) == 0 or self._pending_watermark is None:
+            return 0
+        
+        new = new.drop(columns=['is_new'], errors='ignore')
+        os.makedirs(self.store_dir, exist_ok=True)
+        part_path = os.path.join(self.store_dir, f"part-{len(self._part_paths()):06d}.parquet")
+        new.to_parquet(part_path)
+        
+        # The watermark keeps the fingerprints of every stored row on its date
+        self.watermark = self._pending_watermark
+        last_date, fingerprints = self.watermark['last_date'], self.watermark['fingerprints']
+        tmp_path = f"{self.watermark_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'last_date': last_date.isoformat(), 'fingerprints': sorted(fingerprints)}, f)
+        os.replace(tmp_path, self.watermark_path)
+        
+        self.new_rows, self._pending_watermark = None, None
+        print(f"💾 Appended {len(new)} rows to {part_path} (watermark: {last_date.date()})")
+        return len(new)
@@ -8,10 +8,17 @@ class InsightsGenerator:
     def __init__(self):
         self.insights = []
         
-    def generate_all_insights(self, df, anomalies, forecast):
-        """Generate comprehensive insights from transaction data."""
+    def generate_all_insights(self, df, anomalies, forecast, new_rows=None):
+        """
+        Generate comprehensive insights from transaction data.
+        new_rows: optional boolean mask over anomalies (e.g. 'is_new' from IncrementalLoader)
+        so only transactions that arrived since the last run raise anomaly alerts.
+        """
         self.insights = []
         
+        if new_rows is not None and anomalies is not None:
+            anomalies = anomalies[new_rows]
+        
         # Calculate basic metrics
         self.analyze_spending_patterns(df)
         self.analyze_category_trends(df)
@@ -58,7 +65,7 @@ class InsightsGenerator:
         if len(debit_df) == 0 or 'category' not in debit_df.columns:
             return
         
-        category_spend = debit_df.groupby('category')['amount'].sum().sort_values(ascending=False)
+        category_spend = debit_df.groupby('category', observed=True)['amount'].sum().sort_values(ascending=False)
         total_spend = category_spend.sum()
         
         # Top spending category
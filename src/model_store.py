@@ -0,0 +1,112 @@
+import hashlib
+import json
+import os
+import tempfile
+from collections import OrderedDict
+import joblib
+from . import config
+
+# Process-wide cache of loaded models, keyed by artifact hash.
+# Module globals live as long as the process (Streamlit imports modules once),
+# so reruns and new sessions reuse the loaded model instead of deserializing it again.
+# Bounded (LRU), and pruned versions are dropped, so online saves do not pile up in memory.
+_LOADED_MODELS = OrderedDict()
+
+
+class ModelStore:
+    """
+    Versioned model artifacts under models/<name>/.
+
+    Each save writes an uncompressed joblib file named after the hash of its contents,
+    and LATEST points at the current version. Loading uses mmap_mode='r', so the numpy
+    arrays inside are memory-mapped and worker processes share the same pages instead of
+    each holding a copy. That covers the TF-IDF idf, the linear coefficients and the forest
+    (saved as flat node arrays, see FlatForestClassifier); Python objects such as the
+    TF-IDF vocabulary dict are still unpickled per process.
+    """
+
+    def __init__(self, name, root=config.MODELS_DIR, keep=config.MODEL_STORE_KEEP):
+        self.name = name
+        self.directory = os.path.join(root, name)
+        self.latest_path = os.path.join(self.directory, 'LATEST')
+        self.keep = keep
+
+    def _artifact_path(self, version):
+        return os.path.join(self.directory, f"{version}.joblib")
+
+    def save(self, obj, metadata=None):
+        """Write a new version and make it the latest. Returns the version (content hash)."""
+        os.makedirs(self.directory, exist_ok=True)
+        # Unique temp files: processes and threads (Streamlit sessions) may save at once
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp-', suffix='.joblib')
+        os.close(fd)
+        joblib.dump(obj, tmp_path)  # No compression, so arrays stay memory-mappable
+
+        digest = hashlib.sha256()
+        with open(tmp_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        version = digest.hexdigest()[:16]
+        os.replace(tmp_path, self._artifact_path(version))
+
+        manifest = {'version': version, **(metadata or {})}
+        fd, tmp_latest = tempfile.mkstemp(dir=self.directory, prefix='.LATEST-', suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_latest, self.latest_path)
+
+        self._prune(keep_version=version)
+        return version
+
+    def latest_version(self):
+        if not os.path.exists(self.latest_path):
+            return None
+        with open(self.latest_path) as f:
+            return json.load(f)['version']
+
+    def load(self, version=None):
+        """
+        Return (model, version) for a version (default: latest), or (None, None) if absent.
+        Repeated loads of the same artifact are served from the process-wide cache.
+        """
+        version = version or self.latest_version()
+        if version is None:
+            return None, None
+
+        if version in _LOADED_MODELS:
+            _LOADED_MODELS.move_to_end(version)
+        else:
+            path = self._artifact_path(version)
+            if not os.path.exists(path):
+                return None, None
+            _LOADED_MODELS[version] = joblib.load(path, mmap_mode='r')
+            while len(_LOADED_MODELS) > config.MODEL_CACHE_SIZE:
+                _LOADED_MODELS.popitem(last=False)
+
+        return _LOADED_MODELS[version], version
+
+    def artifact_size(self, version=None):
+        """Size on disk of a version in bytes"""
+        version = version or self.latest_version()
+        return os.path.getsize(self._artifact_path(version)) if version else 0
+
+    def _prune(self, keep_version):
+        """Keep only the newest `keep` versions on disk (plus this save's and LATEST's)"""
+        keep = {f"{keep_version}.joblib", f"{self.latest_version()}.joblib"}
+        artifacts = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.joblib') or name.startswith('.'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                artifacts.append((os.path.getmtime(path), path))
+            except OSError:
+                continue  # Pruned by a concurrent save meanwhile
+        artifacts.sort(reverse=True)
+        for _, path in artifacts[self.keep:]:
+            if os.path.basename(path) not in keep:
+                _LOADED_MODELS.pop(os.path.basename(path)[:-len('.joblib')], None)
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass  # Already pruned by a concurrent save
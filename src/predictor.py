@@ -1,6 +1,13 @@
+import hashlib
+import os
+import tempfile
+from collections import OrderedDict
+import joblib
 import pandas as pd
 import numpy as np
 import warnings
+from . import config
+from .cache import evict_lru
 warnings.filterwarnings('ignore')
 
 # Try to import SARIMA, fallback to simple method if not available
@@ -11,6 +18,81 @@ try:
 except ImportError:
     SARIMA_AVAILABLE = False
 
+# Process-wide: Streamlit reruns the script (and builds a new predictor) on every widget click
+_MEMORY_CACHE = OrderedDict()
+
+def _format_order(order):
+    return '(' + ','.join(map(str, order)) + ')'
+
+class SarimaCache:
+    """
+    Fitted SARIMA parameters and forecasts, keyed by a hash of the daily series and model orders.
+    Entries live in a process-wide LRU and on disk (evicted by size), so identical data is
+    never optimized twice.
+    """
+    
+    def __init__(self, cache_dir=config.FORECAST_CACHE_DIR, max_entries=config.FORECAST_CACHE_SIZE,
+                 max_bytes=config.FORECAST_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+    
+    @staticmethod
+    def key(series, order, seasonal_order, maxiter):
+        """Fingerprint of the series (dates and values) and everything that affects the fit"""
+        digest = hashlib.sha256(repr((order, seasonal_order, maxiter)).encode())
+        digest.update(pd.util.hash_pandas_object(series).to_numpy().tobytes())
+        return digest.hexdigest()
+    
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.joblib")
+    
+    def get(self, key):
+        """Return the cached entry for a key, or None on a miss"""
+        if key in _MEMORY_CACHE:
+            _MEMORY_CACHE.move_to_end(key)
+            return _MEMORY_CACHE[key]
+        
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            entry = joblib.load(path)
+        except Exception as e:
+            print(f"⚠️ Ignoring unreadable forecast cache entry {key[:12]}: {e}")
+            return None
+        
+        # Refresh the access time so eviction keeps hot entries
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self._remember(key, entry)
+        return entry
+    
+    def put(self, key, entry):
+        """Store an entry in memory and on disk"""
+        self._remember(key, entry)
+        
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Unique temp file: processes and threads (Streamlit sessions) may write the same key
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix='.', suffix='.tmp')
+        os.close(fd)
+        try:
+            joblib.dump(entry, tmp_path)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        evict_lru(self.cache_dir, self.max_bytes, suffix='.joblib')
+    
+    def _remember(self, key, entry):
+        _MEMORY_CACHE[key] = entry
+        _MEMORY_CACHE.move_to_end(key)
+        while len(_MEMORY_CACHE) > self.max_entries:
+            _MEMORY_CACHE.popitem(last=False)
+
 class ExpensePredictor:
     """
     Time Series Expense Predictor using SARIMA (Seasonal AutoRegressive Integrated Moving Average)
@@ -26,14 +108,20 @@ class ExpensePredictor:
     - (1,1,1,7): Seasonal (P,D,Q,s) - captures weekly patterns (s=7 days)
     """
     
-    def __init__(self):
+    def __init__(self, use_cache=True):
         self.is_trained = False
         self.model = None
         self.fitted_model = None
+        self.latest_results = None  # fitted_model extended with the days added by update() since the fit
         self.daily_spend_series = None
         self.last_date = None
         self.use_sarima = SARIMA_AVAILABLE
         self.daily_avg = 0  # Fallback for simple method
+        self.forecast = None  # Longest forecast computed for the fitted model (shorter ones are its prefix)
+        self.cache = SarimaCache() if use_cache else None
+        # Since the last full fit: days appended by update() and their squared standardized errors
+        self.days_since_refit = 0
+        self.drift_sq_errors = 0.0
 
     def train(self, df):
         """
@@ -50,38 +138,22 @@ class ExpensePredictor:
             return False
         
         # 2. Group by Date and resample to daily frequency
-        daily_spend = df.groupby('date')['amount'].sum()
-        daily_spend = daily_spend.resample('D').sum().fillna(0)
-        
+        return self._train_daily(self._daily_spend(df))
+
+    def _train_daily(self, daily_spend):
+        """Fit the predictor on a daily spend series (steps 3-4 of train)"""
         self.daily_spend_series = daily_spend
         self.last_date = daily_spend.index.max()
+        self.forecast = None
         
         # 3. Try SARIMA if available and enough data
         if self.use_sarima and len(daily_spend) >= 21:
             try:
-                print("🤖 Training SARIMA model for time series forecasting...")
-                
-                # SARIMA Parameters:
-                # order=(1,1,1): AR=1, differencing=1, MA=1
-                # seasonal_order=(1,1,1,7): Seasonal AR=1, D=1, MA=1, period=7 (weekly)
-                # This captures both daily trends and weekly spending patterns
-                
-                self.model = SARIMAX(
-                    daily_spend,
-                    order=(1, 1, 1),  # (p, d, q) - non-seasonal parameters
-                    seasonal_order=(1, 1, 1, 7),  # (P, D, Q, s) - seasonal parameters
-                    enforce_stationarity=False,
-                    enforce_invertibility=False
-                )
-                
-                # Fit the model
-                with warnings.catch_warnings():
-                    warnings.filterwarnings('ignore', category=ConvergenceWarning)
-                    self.fitted_model = self.model.fit(disp=False, maxiter=100)
+                self._fit_sarima(daily_spend)
                 
                 self.is_trained = True
                 print(f"✅ SARIMA model trained successfully!")
-                print(f"   Model: SARIMA(1,1,1)(1,1,1,7)")
+                print(f"   Model: SARIMA{_format_order(config.SARIMA_ORDER)}{_format_order(config.SARIMA_SEASONAL_ORDER)}")
                 print(f"   Training data: {len(daily_spend)} days")
                 print(f"   AIC Score: {self.fitted_model.aic:.2f}")
                 return True
@@ -100,6 +172,145 @@ class ExpensePredictor:
             print(f"   Average Daily Spend: ₹{self.daily_avg:.2f}")
             return True
 
+    def _daily_spend(self, df):
+        """Total debits per day, with days without spending as 0"""
+        df = df[df['type'] == 'debit']
+        daily_spend = df.groupby('date')['amount'].sum()
+        return daily_spend.resample('D').sum().fillna(0)
+
+    def _fit_sarima(self, daily_spend, start_params=None):
+        """
+        Fit SARIMA on a daily series (or restore it from the cache).
+        start_params warm-starts the optimizer, e.g. from the previous fit.
+        """
+        # SARIMA Parameters:
+        # order=(1,1,1): AR=1, differencing=1, MA=1
+        # seasonal_order=(1,1,1,7): Seasonal AR=1, D=1, MA=1, period=7 (weekly)
+        # This captures both daily trends and weekly spending patterns
+        
+        self.model = self._build_model(daily_spend)
+        self.forecast = None
+        self.days_since_refit = 0
+        self.drift_sq_errors = 0.0
+        
+        key = None
+        cached = None
+        if self.cache is not None:
+            key = SarimaCache.key(daily_spend, config.SARIMA_ORDER, config.SARIMA_SEASONAL_ORDER, config.SARIMA_MAXITER)
+            cached = self.cache.get(key)
+        
+        if cached is not None:
+            # Same data as before: rebuild the results from the stored parameters
+            # (a single Kalman filter pass) instead of re-optimizing
+            self.fitted_model = self.latest_results = self.model.filter(cached['params'])
+            self.forecast = cached['forecast']
+            print("⚡ SARIMA model loaded from cache.")
+            return
+        
+        print("🤖 Training SARIMA model for time series forecasting...")
+        
+        # Fit the model
+        with warnings.catch_warnings():
+            warnings.filterwarnings('ignore', category=ConvergenceWarning)
+            self.fitted_model = self.model.fit(start_params=start_params, disp=False, maxiter=config.SARIMA_MAXITER)
+        self.latest_results = self.fitted_model
+        
+        if key is not None:
+            self.forecast = self._forecast(config.FORECAST_HORIZON)
+            try:
+                self.cache.put(key, {'params': self.fitted_model.params.to_numpy(), 'forecast': self.forecast})
+            except Exception as e:
+                print(f"⚠️ Could not cache SARIMA model: {e}")
+
+    def _build_model(self, daily_spend):
+        """SARIMA model for a daily series"""
+        return SARIMAX(
+            daily_spend,
+            order=config.SARIMA_ORDER,  # (p, d, q) - non-seasonal parameters
+            seasonal_order=config.SARIMA_SEASONAL_ORDER,  # (P, D, Q, s) - seasonal parameters
+            enforce_stationarity=False,
+            enforce_invertibility=False
+        )
+
+    def update(self, df):
+        """
+        Bring the model up to date with new transactions, without re-optimizing.
+        df is either the full history or only the new transactions.
+        
+        New days extend the filtered results with the parameters held fixed
+        (results.extend(), one Kalman filter step per new day whatever the history length).
+        New transactions on already-seen days (e.g. the rest of the last day) are added to those
+        days' totals, and the history is filtered once more with the same parameters.
+        A full refit, warm-started from the current parameters, runs every SARIMA_REFIT_DAYS
+        days or when the new days fit badly; if it fails, the extended model is kept.
+        Without a SARIMA model to extend (moving average), the new days are merged into the
+        history and the predictor is refitted on it. If a full history disagrees with the
+        days already seen, this falls back to train().
+        """
+        if not self.is_trained:
+            return self.train(df)
+        
+        daily_spend = self._daily_spend(df)
+        full_history = daily_spend.index.min() <= self.daily_spend_series.index.min()
+        if not (self.use_sarima and self.fitted_model is not None):
+            # Moving average: no model to extend, refit it on the history plus the new days
+            if not full_history:
+                daily_spend = self.daily_spend_series.add(daily_spend, fill_value=0).asfreq('D', fill_value=0)
+            return self._train_daily(daily_spend)
+        
+        seen = daily_spend[daily_spend.index <= self.last_date]
+        if full_history:
+            # Full history: the seen days must be the ones the model was fitted on
+            if not np.allclose(seen.values, self.daily_spend_series.reindex(seen.index, fill_value=0).values):
+                print("⚠️ Past days changed, retraining the predictor...")
+                return self.train(df)
+        elif (seen != 0).any():
+            # Only new transactions: the ones on seen days add to those days' totals
+            self.daily_spend_series = self.daily_spend_series.add(seen, fill_value=0).asfreq('D')
+            self.model = self._build_model(self.daily_spend_series)
+            self.fitted_model = self.latest_results = self.model.filter(self.latest_results.params)
+            self.forecast = None
+            print(f"🔄 Added late transactions to {(seen != 0).sum()} seen days.")
+        
+        new_days = daily_spend[daily_spend.index > self.last_date]
+        if new_days.empty:
+            return True
+        # Days between the last seen day and the first new transaction had no spending
+        new_days = new_days.reindex(
+            pd.date_range(self.last_date + pd.Timedelta(days=1), new_days.index.max(), freq='D'), fill_value=0
+        )
+        
+        self.latest_results = self.latest_results.extend(new_days)
+        self.daily_spend_series = pd.concat([self.daily_spend_series, new_days]).asfreq('D')
+        self.last_date = new_days.index.max()
+        self.forecast = None
+        
+        # One-step-ahead errors of the new days, in units of their predicted standard deviation
+        errors = self.latest_results.filter_results.standardized_forecasts_error[0]
+        self.days_since_refit += len(new_days)
+        self.drift_sq_errors += float(np.nansum(errors ** 2))
+        drift = self.drift_sq_errors / self.days_since_refit
+        
+        if self.days_since_refit >= config.SARIMA_REFIT_DAYS:
+            print(f"🔄 {self.days_since_refit} days since the last fit, refitting SARIMA...")
+        elif self.days_since_refit >= config.SARIMA_DRIFT_MIN_DAYS and drift > config.SARIMA_DRIFT_THRESHOLD:
+            print(f"🔄 Forecast errors drifted (mean squared z {drift:.1f}), refitting SARIMA...")
+        else:
+            print(f"✅ SARIMA model extended with {len(new_days)} new days.")
+            return True
+        
+        state = (self.model, self.fitted_model, self.latest_results, self.days_since_refit, self.drift_sq_errors)
+        try:
+            self._fit_sarima(self.daily_spend_series, start_params=self.latest_results.params)
+        except Exception as e:
+            # Keep forecasting from the extended model; the refit is retried with the next update
+            print(f"⚠️ SARIMA refit failed: {str(e)}")
+            self.model, self.fitted_model, self.latest_results, self.days_since_refit, self.drift_sq_errors = state
+            self.forecast = None
+            return True
+        print(f"✅ SARIMA model refitted on {len(self.daily_spend_series)} days. AIC Score: {self.fitted_model.aic:.2f}")
+        return True
+
     def predict_next_30_days(self):
         """
         Forecast next 30 days of spending using SARIMA or moving average.
@@ -107,21 +318,37 @@ class ExpensePredictor:
         Returns:
             DataFrame with columns: ds (date), yhat (prediction), yhat_lower, yhat_upper
         """
+        return self.predict(30)
+
+    def predict(self, horizon=config.FORECAST_HORIZON):
+        """
+        Forecast the next `horizon` days (same columns as predict_next_30_days).
+        
+        Each fitted model is forecast once: the longest forecast so far is kept, and shorter
+        horizons are its first rows (a k-step forecast does not depend on the total horizon).
+        """
         if not self.is_trained:
             return None
         
+        if self.forecast is None or len(self.forecast) < horizon:
+            self.forecast = self._forecast(horizon)
+        
+        return self.forecast.head(horizon).copy()
+
+    def _forecast(self, horizon):
+        """Run the forecast for `horizon` days"""
         # Generate future dates
         future_dates = pd.date_range(
             start=self.last_date + pd.Timedelta(days=1), 
-            periods=30, 
+            periods=horizon, 
             freq='D'
         )
         
         # SARIMA Prediction
-        if self.use_sarima and self.fitted_model is not None:
+        if self.use_sarima and self.latest_results is not None:
             try:
                 # Get forecast with confidence intervals
-                forecast_result = self.fitted_model.get_forecast(steps=30)
+                forecast_result = self.latest_results.get_forecast(steps=horizon)
                 forecast_mean = forecast_result.predicted_mean
                 forecast_ci = forecast_result.conf_int(alpha=0.2)  # 80% confidence interval
                 
@@ -144,7 +371,8 @@ class ExpensePredictor:
                 print("   Using moving average fallback...")
         
         # Fallback: Moving Average with variance
-        random_variation = np.random.uniform(0.85, 1.15, 30)
+        # Seeded, so the same data always gives the same forecast (and longer horizons extend shorter ones)
+        random_variation = np.random.default_rng(config.FORECAST_SEED).uniform(0.85, 1.15, horizon)
         predicted_values = self.daily_avg * random_variation
         
         forecast_df = pd.DataFrame({
@@ -156,9 +384,10 @@ class ExpensePredictor:
         
         return forecast_df
 
-    def get_total_predicted_spend(self):
+    def get_total_predicted_spend(self, horizon=config.FORECAST_HORIZON):
         """
-        Calculate total predicted spending for next 30 days.
+        Calculate total predicted spending for the next `horizon` days (default 30).
+        Served from the memoized forecast, so it never re-runs the model.
         
         Returns:
             float: Total predicted amount
@@ -166,11 +395,11 @@ class ExpensePredictor:
         if not self.is_trained:
             return 0
         
-        forecast = self.predict_next_30_days()
+        forecast = self.predict(horizon)
         if forecast is not None:
             return forecast['yhat'].sum()
         
-        return self.daily_avg * 30
+        return self.daily_avg * horizon
     
     def get_model_info(self):
         """
@@ -185,8 +414,8 @@ class ExpensePredictor:
         if self.use_sarima and self.fitted_model is not None:
             return {
                 'model_type': 'SARIMA',
-                'order': '(1,1,1)',
-                'seasonal_order': '(1,1,1,7)',
+                'order': _format_order(config.SARIMA_ORDER),
+                'seasonal_order': _format_order(config.SARIMA_SEASONAL_ORDER),
                 'aic': f"{self.fitted_model.aic:.2f}",
                 'bic': f"{self.fitted_model.bic:.2f}",
                 'training_samples': len(self.daily_spend_series),
@@ -0,0 +1,70 @@
+"""
+Checks for the anomaly detectors' persistence, update and streaming paths.
+Run with `python test_anomaly_detector.py` (pytest also collects the test_ functions).
+"""
+import tempfile
+import numpy as np
+import pandas as pd
+from src.data_processor import DataLoader
+from src.anomaly_detector import AnomalyDetector, StreamingAnomalyDetector
+from src.model_store import ModelStore
+
+def load_sample():
+    loader = DataLoader('data/sample_template.csv')
+    loader.load_data()
+    return loader.preprocess_data()
+
+def test_loaded_model_is_not_mutated():
+    """update()/train() on a loaded detector leave the saved artifact (and other loads) untouched"""
+    df = load_sample()
+    with tempfile.TemporaryDirectory() as tmp:
+        detector = AnomalyDetector()
+        detector.store = ModelStore('anomaly_detector', root=tmp)
+        detector.train(df)
+        version = detector.save()
+        expected = detector.predict(df)['anomaly_score'].to_numpy()
+
+        first = AnomalyDetector()
+        first.store = detector.store
+        first.load(version)
+        first.update(df, n_trees=10)
+        first.train(df.iloc[::2])
+
+        second = AnomalyDetector()
+        second.store = detector.store
+        second.load(version)
+        assert second.model is not first.model and second.scaler is not first.scaler
+        assert np.allclose(second.predict(df)['anomaly_score'], expected)
+
+def test_update_keeps_forest_size():
+    """update() swaps the oldest trees for new ones, even for a month smaller than a tree's sample"""
+    df = load_sample()
+    detector = AnomalyDetector()
+    detector.train(df)
+    n_trees = len(detector.model.estimators_)
+    month = df['date'] >= df['date'].max() - pd.Timedelta(days=30)
+    for _ in range(3):
+        detector.update(df, rows=month, n_trees=10)
+    assert len(detector.model.estimators_) == len(detector.model.estimators_features_) == n_trees
+    assert detector.model.n_estimators == n_trees
+    assert len(detector.predict(df)) == len(df)
+
+def test_streaming_fixed_charge():
+    """A group with identical amounts (a subscription) still alerts on a large charge"""
+    detector = StreamingAnomalyDetector()
+    dates = pd.date_range('2024-01-01', periods=42, freq='W')
+    for date in dates[:40]:
+        assert not detector.process({'date': date, 'amount': 649, 'category': 'Subscriptions'})['is_anomaly']
+
+    usual = detector.score({'date': dates[40], 'amount': 655, 'category': 'Subscriptions'})
+    assert not usual['is_anomaly']
+    result = detector.process({'date': dates[41], 'amount': 50000, 'category': 'Subscriptions'})
+    assert result['is_anomaly'] and result['anomaly_score'] < -detector.threshold
+
+def main():
+    for check in [test_loaded_model_is_not_mutated, test_update_keeps_forest_size, test_streaming_fixed_charge]:
+        check()
+        print(f"✅ {check.__name__}")
+
+if __name__ == "__main__":
+    main()
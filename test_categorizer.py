@@ -0,0 +1,123 @@
+"""
+Checks for the categorizer's rule engine, model artifacts and description cache.
+Run with `python test_categorizer.py` (pytest also collects the test_ functions).
+"""
+import os
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+from src import config, model_store
+from src.data_processor import DataLoader
+from src.categorizer import TransactionCategorizer, CategoryCache
+from src.model_store import ModelStore
+
+DESCRIPTIONS = pd.Series([
+    'UPI/Swiggy Order #123', 'POS STARBUCKS  COFFEE*MUMBAI', 'NEFT-Salary Credit',
+    'Amazon.in Shopping', 'UPI/Swiggy Order #123', '', '  Uber   Ride  ', 'ACH*Netflix.com',
+    'Apollo Pharmacy 24/7', 'Paid to Ramesh', 'Random Vendor 42', None,
+])
+
+FRAME = pd.DataFrame({'clean_description': ['uber ride', 'swiggy order', 'uber ride', 'netflix']})
+
+def cached_categorizer(path):
+    categorizer = TransactionCategorizer(use_cache=False)
+    categorizer.cache = CategoryCache(path=path)
+    return categorizer
+
+def loop_keyword_category(keyword_map, description):
+    """The original rule engine: every category, every keyword, once per row"""
+    for category, keywords in keyword_map.items():
+        for keyword in keywords:
+            if keyword in description:
+                return category
+    return None
+
+def test_keyword_matcher_matches_loop():
+    """The compiled matcher picks the same category as the keyword loop"""
+    categorizer = TransactionCategorizer(use_cache=False)
+    cleaned = DataLoader(None)._clean_descriptions(DESCRIPTIONS.fillna(''))
+    expected = [loop_keyword_category(categorizer.keyword_map, text) for text in cleaned]
+    matched = categorizer._get_keyword_categories(cleaned)
+    assert [None if pd.isna(value) else value for value in matched] == expected
+
+def test_saved_forest_is_memory_mapped():
+    """A loaded forest is flat memory-mapped arrays and predicts like the trained one"""
+    loader = DataLoader('data/sample_template.csv')
+    loader.load_data()
+    df = loader.preprocess_data()
+    with tempfile.TemporaryDirectory() as tmp:
+        trained = TransactionCategorizer(use_cache=False)
+        trained.store = ModelStore('categorizer', root=tmp)
+        trained.train(df)
+        version = trained.save()
+
+        loaded = TransactionCategorizer(use_cache=False)
+        loaded.store = trained.store
+        loaded.load(version)
+        forest = loaded.pipeline.named_steps['clf']
+        assert isinstance(forest.left_, np.memmap) and isinstance(forest.value_, np.memmap)
+
+        X = trained.pipeline.named_steps['tfidf'].transform(df['clean_description'])
+        repeated = X[np.arange(config.FOREST_FLAT_MAX_ROWS * 2) % X.shape[0]]
+        for batch in [X[:5], repeated]:  # Flat walk, then the unpickled forest
+            expected = trained.pipeline.named_steps['clf'].predict_proba(batch)
+            assert np.allclose(forest.predict_proba(batch), expected)
+
+        # Loaded artifacts stay bounded in memory
+        for i in range(config.MODEL_CACHE_SIZE + 2):
+            trained.store.load(trained.store.save({'step': i}))
+        assert len(model_store._LOADED_MODELS) <= config.MODEL_CACHE_SIZE
+
+def test_cache_persists_results():
+    """A second session is served from the saved cache"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'category_cache.pkl')
+        first = cached_categorizer(path).predict(FRAME)
+
+        categorizer = cached_categorizer(path)
+        assert categorizer.predict(FRAME).tolist() == first.tolist()
+        assert categorizer.cache.hits == 3 and categorizer.cache.misses == 0
+
+def test_cache_save_failure_keeps_predicting():
+    """An unwritable cache file only costs the cache, not the prediction"""
+    with tempfile.TemporaryDirectory() as tmp:
+        blocker = os.path.join(tmp, 'not_a_directory')
+        open(blocker, 'w').close()
+        categorizer = cached_categorizer(os.path.join(blocker, 'category_cache.pkl'))
+        assert categorizer.predict(FRAME).tolist()[0] == 'Transportation'
+
+def test_concurrent_cache_saves():
+    """Sessions saving at the same time (threads) do not collide on a temp file"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'category_cache.pkl')
+        caches = [CategoryCache(path=path) for _ in range(8)]
+        for i, cache in enumerate(caches):
+            cache.store('v1', [f'merchant {i}'], ['Other'])
+        errors = []
+
+        def save(cache):
+            try:
+                for _ in range(20):
+                    cache.save()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=save, args=(cache,)) for cache in caches]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert not errors
+        assert len(CategoryCache(path=path).entries) == 1
+        assert os.listdir(tmp) == ['category_cache.pkl']
+
+def main():
+    for check in [test_keyword_matcher_matches_loop, test_saved_forest_is_memory_mapped,
+                  test_cache_persists_results, test_cache_save_failure_keeps_predicting,
+                  test_concurrent_cache_saves]:
+        check()
+        print(f"✅ {check.__name__}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Checks for DataLoader's cleaning and compact schema.
+Run with `python test_data_processor.py` (pytest also collects the test_ functions).
+"""
+import numpy as np
+import pandas as pd
+from src.data_processor import DataLoader
+
+DESCRIPTIONS = pd.Series([
+    'UPI/Swiggy Order #123', 'POS STARBUCKS  COFFEE*MUMBAI', 'NEFT-Salary Credit',
+    'Amazon.in Shopping', 'UPI/Swiggy Order #123', '', '  Uber   Ride  ', 'ACH*Netflix.com',
+    'Apollo Pharmacy 24/7', 'Paid to Ramesh', 'Random Vendor 42', None,
+])
+
+def test_clean_descriptions_match_clean_text():
+    """The vectorized cleaner gives the same text as the per-row _clean_text"""
+    loader = DataLoader(None)
+    descriptions = DESCRIPTIONS.fillna('')
+    expected = descriptions.apply(loader._clean_text)
+    assert loader._clean_descriptions(descriptions).tolist() == expected.tolist()
+
+def test_compact_keeps_money_exact():
+    """Compact frames give the same totals as full ones (no int16 wrap, no float32 drift)"""
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'date': pd.Timestamp('2024-01-01'), 'description': 'Test', 'clean_description': 'test',
+        'amount': rng.gamma(2, 400, 100_000).round(2), 'type': 'debit',
+        'category': rng.choice(['Food & Dining', 'Shopping'], 100_000),
+    })
+    compact = DataLoader(None).to_compact(df)
+    assert compact['amount'].dtype == 'float64'
+    assert compact['amount'].sum() == df['amount'].sum()
+    assert np.allclose(
+        compact.groupby('category', observed=True)['amount'].sum().sort_index(),
+        df.groupby('category')['amount'].sum().sort_index(), rtol=0, atol=0.005,
+    )
+
+    whole_rupees = DataLoader(None).to_compact(df.assign(amount=np.full(len(df), 20_000)))
+    assert whole_rupees['amount'].dtype == 'int64' and whole_rupees['amount'].sum() == 20_000 * len(df)
+
+def main():
+    for check in [test_clean_descriptions_match_clean_text, test_compact_keeps_money_exact]:
+        check()
+        print(f"✅ {check.__name__}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Checks for incremental ingestion, deduplication and row-masked prediction.
+Run with `python test_incremental.py` (pytest also collects the test_ functions).
+"""
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from src.data_processor import DataLoader, Deduplicator, IncrementalLoader
+from src.anomaly_detector import AnomalyDetector
+from src.categorizer import TransactionCategorizer
+
+STATEMENT = pd.DataFrame({
+    'date': ['2024-03-01', '2024-03-02', '2024-03-03', '2024-03-03'],
+    'description': ['Swiggy Order', 'Uber Ride', 'Starbucks Coffee', 'Starbucks Coffee'],
+    'amount': [320, 180, 250, 250],
+    'type': ['debit', 'debit', 'debit', 'debit'],
+})
+
+def write_csv(directory, df, name='statement.csv'):
+    path = os.path.join(directory, name)
+    df.to_csv(path, index=False)
+    return path
+
+def ingest(path, store_dir):
+    """One incremental run: load rows past the watermark and commit them"""
+    loader = IncrementalLoader(path, store_dir=store_dir)
+    new = loader.load_new()
+    loader.commit()
+    return new
+
+def test_reingest_same_file():
+    """The same statement twice: nothing new the second time"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path, store = write_csv(tmp, STATEMENT), os.path.join(tmp, 'store')
+        assert len(ingest(path, store)) == 4
+        assert len(ingest(path, store)) == 0
+        assert len(IncrementalLoader(path, store_dir=store).load_history()) == 4
+
+def test_late_row_on_watermark_date():
+    """A third coffee lands on the watermark date after the first run: exactly 1 new row"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path, store = write_csv(tmp, STATEMENT), os.path.join(tmp, 'store')
+        ingest(path, store)
+
+        late = pd.concat([STATEMENT, STATEMENT.iloc[[3]]], ignore_index=True)
+        write_csv(tmp, late)
+        new = ingest(path, store)
+        assert len(new) == 1 and new['description'].iloc[0] == 'Starbucks Coffee'
+        assert len(ingest(path, store)) == 0
+
+def test_identical_same_day_rows_kept():
+    """Two identical coffees on the same day are real transactions, not duplicates"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_csv(tmp, STATEMENT)
+        df = DataLoader(path).load_processed(use_cache=False)
+
+        deduplicator = Deduplicator(index_path=None)
+        assert len(deduplicator.drop_duplicates(df)) == 4 and deduplicator.num_dropped == 0
+
+        # Persistent index: a rerun on the same file keeps its rows,
+        # an overlapping download drops the rows it shares with the first one
+        index_path = os.path.join(tmp, 'index.bin')
+        first = DataLoader(path).load_processed(use_cache=False, dedupe=True, index_path=index_path)
+        rerun = DataLoader(path).load_processed(use_cache=False, dedupe=True, index_path=index_path)
+        assert len(first) == len(rerun) == 4
+
+        overlap = pd.concat([STATEMENT.iloc[2:], pd.DataFrame({
+            'date': ['2024-03-04'], 'description': ['Zomato Order'], 'amount': [410], 'type': ['debit'],
+        })], ignore_index=True)
+        overlap_path = write_csv(tmp, overlap, 'overlap.csv')
+        new = DataLoader(overlap_path).load_processed(use_cache=False, dedupe=True, index_path=index_path)
+        assert new['description'].tolist() == ['Zomato Order']
+
+def test_predict_rows_mask():
+    """predict(rows=mask) scores only the masked rows and leaves the others untouched"""
+    loader = DataLoader('data/sample_template.csv')
+    loader.load_data()
+    df = loader.preprocess_data()
+    mask = np.arange(len(df)) % 3 == 0
+
+    detector = AnomalyDetector()
+    detector.train(df)
+    full = detector.predict(df)
+
+    marked = full.copy()
+    marked.loc[~mask, 'anomaly_score'] = 123.0
+    marked.loc[~mask, 'is_anomaly'] = True
+    result = detector.predict(marked, rows=mask)
+    assert (result.loc[~mask, 'anomaly_score'] == 123.0).all() and result.loc[~mask, 'is_anomaly'].all()
+    assert np.allclose(result.loc[mask, 'anomaly_score'], full.loc[mask, 'anomaly_score'])
+    assert (result.loc[mask, 'is_anomaly'] == full.loc[mask, 'is_anomaly']).all()
+
+    # Categorizer: masked rows are keyword hits, so no trained model is needed
+    df = df.assign(category='Unchanged')
+    categories = TransactionCategorizer(use_cache=False).predict(df, rows=df['clean_description'].str.contains('uber'))
+    assert (categories[df['clean_description'].str.contains('uber')] == 'Transportation').all()
+    assert (categories[~df['clean_description'].str.contains('uber')] == 'Unchanged').all()
+
+def main():
+    for check in [test_reingest_same_file, test_late_row_on_watermark_date,
+                  test_identical_same_day_rows_kept, test_predict_rows_mask]:
+        check()
+        print(f"✅ {check.__name__}")
+
+if __name__ == "__main__":
+    main()
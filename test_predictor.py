@@ -0,0 +1,134 @@
+"""
+Checks for ExpensePredictor's model cache, forecast memo and incremental update path.
+Run with `python test_predictor.py` (pytest also collects the test_ functions).
+"""
+import os
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+from src import predictor as predictor_module
+from src.predictor import ExpensePredictor, SarimaCache
+
+def spending(n_days, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2024-01-01', periods=n_days, freq='D')
+    return pd.DataFrame({'date': dates, 'description': 'Test', 'amount': rng.gamma(2, 300, n_days), 'type': 'debit'})
+
+def test_sarima_cache_skips_refit():
+    """The same series is restored from the disk cache (no optimizer run) with the same forecast"""
+    df = spending(60)
+    with tempfile.TemporaryDirectory() as tmp:
+        first = ExpensePredictor()
+        first.cache = SarimaCache(cache_dir=tmp)
+        first.train(df)
+
+        predictor_module._MEMORY_CACHE.clear()
+        fit = predictor_module.SARIMAX.fit
+        def no_fit(*args, **kwargs):
+            raise AssertionError("SARIMA was re-optimized")
+        predictor_module.SARIMAX.fit = no_fit
+        try:
+            second = ExpensePredictor()
+            second.cache = SarimaCache(cache_dir=tmp)
+            second.train(df)
+        finally:
+            predictor_module.SARIMAX.fit = fit
+        assert second.use_sarima
+        assert np.allclose(second.fitted_model.params, first.fitted_model.params)
+        assert np.allclose(second.predict(30)['yhat'], first.predict(30)['yhat'])
+
+def test_sarima_cache_concurrent_puts():
+    """Sessions writing the same entry at once (threads) do not collide on a temp file"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache, errors = SarimaCache(cache_dir=tmp), []
+        def put():
+            try:
+                for _ in range(20):
+                    cache.put('key', {'params': np.arange(5.0)})
+            except Exception as e:
+                errors.append(e)
+        threads = [threading.Thread(target=put) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert not errors and os.listdir(tmp) == ['key.joblib']
+
+def test_forecast_memo():
+    """Each fitted model is forecast once; shorter horizons and returned copies do not change it"""
+    predictor = ExpensePredictor(use_cache=False)
+    predictor.train(spending(60))
+    calls = []
+    forecast = predictor._forecast
+    predictor._forecast = lambda horizon: calls.append(horizon) or forecast(horizon)
+
+    long = predictor.predict(30)
+    long['yhat'] = -1.0
+    short = predictor.predict(7)
+    assert calls == [30] and (short['yhat'] >= 0).all()
+    assert short.equals(predictor.predict(30).head(7))
+
+    predictor.predict(45)
+    assert calls == [30, 45]
+
+def test_forecast_update_late_row():
+    """Only new rows, one of them on the last seen day: it adds to that day instead of retraining"""
+    dates = pd.date_range('2024-01-01', periods=60, freq='D')
+    history = pd.DataFrame({
+        'date': dates, 'description': 'Test', 'amount': [500, 600, 450, 700, 800, 550, 400] * 8 + [500, 600, 450, 700],
+        'type': 'debit',
+    })
+    predictor = ExpensePredictor(use_cache=False)
+    predictor.train(history)
+    params = predictor.fitted_model.params
+
+    new = pd.DataFrame({
+        'date': [dates[-1], dates[-1] + pd.Timedelta(days=2)], 'description': 'Test', 'amount': [100, 300],
+        'type': 'debit',
+    })
+    predictor.update(new)
+    assert predictor.daily_spend_series.iloc[-3:].tolist() == [800, 0, 300]
+    assert predictor.last_date == dates[-1] + pd.Timedelta(days=2) and predictor.days_since_refit == 2
+
+    # Same forecast as filtering the whole updated series with the same parameters
+    expected = predictor._build_model(predictor.daily_spend_series).filter(params).forecast(5)
+    assert np.allclose(predictor.latest_results.forecast(5), expected, rtol=1e-3)
+
+def test_update_moving_average_keeps_history():
+    """Without a SARIMA model, update() with only new rows refits on the history plus the new days"""
+    dates = pd.date_range('2024-01-01', periods=33, freq='D')
+    df = pd.DataFrame({'date': dates, 'description': 'Test', 'amount': [600.0] * 18 + [10.0] * 15, 'type': 'debit'})
+    predictor = ExpensePredictor(use_cache=False)
+    predictor.use_sarima = False
+    predictor.train(df.iloc[:18])
+
+    predictor.update(df.iloc[18:])
+    assert len(predictor.daily_spend_series) == 33 and predictor.last_date == dates[-1]
+    assert np.isclose(predictor.daily_avg, df['amount'].tail(30).mean())
+
+def test_failed_refit_keeps_extended_model():
+    """A refit that raises leaves update() working from the extended model"""
+    rng = np.random.default_rng(0)
+    dates = pd.date_range('2024-01-01', periods=60, freq='D')
+    df = pd.DataFrame({'date': dates, 'description': 'Test', 'amount': rng.gamma(2, 300, 60), 'type': 'debit'})
+    predictor = ExpensePredictor(use_cache=False)
+    predictor.train(df.iloc[:28])
+
+    def failing_fit(*args, **kwargs):
+        raise np.linalg.LinAlgError("singular matrix")
+    predictor._fit_sarima = failing_fit
+    for day in range(28, 60):
+        assert predictor.update(df.iloc[day:day + 1])
+    assert predictor.last_date == dates[-1] and predictor.days_since_refit == 32
+    assert len(predictor.predict(30)) == 30
+
+def main():
+    for check in [test_sarima_cache_skips_refit, test_sarima_cache_concurrent_puts, test_forecast_memo,
+                  test_forecast_update_late_row, test_update_moving_average_keeps_history,
+                  test_failed_refit_keeps_extended_model]:
+        check()
+        print(f"✅ {check.__name__}")
+
+if __name__ == "__main__":
+    main()